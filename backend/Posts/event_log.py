@@ -0,0 +1,195 @@
+"""Append-only columnar log of raw engagement events.
+
+Every metric received by `sendVideoMetrics` is appended here before it is
+folded into `UserMetadata`, so offline jobs (ClipModelTrain etc.) can retrain
+from the raw signal without reading the OLTP database.
+
+Layout on disk (ENGAGEMENT_LOG_DIR):
+
+    <window>/<pid>-<seq>.npy
+
+`<window>` is the UTC start of the roll period (e.g. 20251019T14 for hourly
+rolls). Each `.npy` file is a NumPy record array with EVENT_DTYPE and is never
+modified after it is written, so readers can memory-map any chunk safely.
+"""
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from django.conf import settings
+
+
+EVENT_DTYPE = np.dtype([
+    ('ts', '<f8'),            # unix seconds
+    ('user_id', '<i8'),
+    ('video_id', '<i8'),
+    ('watch_pct', '<f4'),
+    ('liked', '?'),
+    ('commented', '?'),
+    ('categories', 'S128'),   # utf-8, '|' separated
+])
+
+WINDOW_FORMAT = '%Y%m%dT%H'
+
+
+def _log_dir() -> Path:
+    return Path(getattr(settings, 'ENGAGEMENT_LOG_DIR', Path(settings.BASE_DIR) / 'engagement_log'))
+
+
+def _window_for(ts: float) -> str:
+    roll = int(getattr(settings, 'ENGAGEMENT_LOG_ROLL_SECONDS', 3600))
+    start = int(ts) - int(ts) % roll
+    return datetime.fromtimestamp(start, tz=timezone.utc).strftime(WINDOW_FORMAT)
+
+
+def _to_int(value, default=-1):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _truncate_utf8(text: str, size: int) -> bytes:
+    """UTF-8 bytes of `text`, cut to at most `size` bytes on a character boundary."""
+    return text.encode('utf-8')[:size].decode('utf-8', 'ignore').encode('utf-8')
+
+
+class EngagementLog:
+    """Per-process buffer that flushes immutable chunks to disk.
+
+    Rows are buffered in memory and written out when the buffer reaches
+    `max_rows`, when it is older than `max_age` seconds, when the roll window
+    changes, or at interpreter exit. The age check also runs on a daemon
+    thread, so a quiet process does not sit on events until the next append.
+    """
+
+    def __init__(self, directory=None, max_rows=None, max_age=None):
+        self._directory = Path(directory) if directory else None
+        self.max_rows = max_rows or int(getattr(settings, 'ENGAGEMENT_LOG_FLUSH_ROWS', 512))
+        self.max_age = max_age or float(getattr(settings, 'ENGAGEMENT_LOG_FLUSH_SECONDS', 60))
+        self._rows = []
+        self._window = None
+        self._first_ts = None
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or _log_dir()
+
+    def append(self, user_id, metrics: Iterable[dict], ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        window = _window_for(ts)
+        rows = []
+        for metric in metrics:
+            categories = '|'.join(str(c) for c in (metric.get('categories') or []))
+            rows.append((
+                ts,
+                _to_int(user_id),
+                _to_int(metric.get('videoId')),
+                _to_float(metric.get('watchPercentage')),
+                bool(metric.get('liked', False)),
+                bool(metric.get('commented', False)),
+                _truncate_utf8(categories, EVENT_DTYPE['categories'].itemsize),
+            ))
+        if not rows:
+            return
+        with self._lock:
+            self._ensure_flusher()
+            if self._window is not None and window != self._window:
+                self._flush_locked()
+            self._window = window
+            if self._first_ts is None:
+                self._first_ts = ts
+            self._rows.extend(rows)
+            if len(self._rows) >= self.max_rows or ts - self._first_ts >= self.max_age:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _ensure_flusher(self):
+        # Started lazily (and again after a fork, which leaves no threads behind)
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_aged, name='engagement-log-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_aged(self):
+        interval = max(self.max_age / 4, 0.05)
+        while True:
+            time.sleep(interval)
+            try:
+                with self._lock:
+                    if self._first_ts is not None and time.time() - self._first_ts >= self.max_age:
+                        self._flush_locked()
+            except Exception as e:
+                print(f"EngagementLog: periodic flush failed: {e}")
+
+    def _flush_locked(self):
+        if not self._rows:
+            return
+        chunk = np.array(self._rows, dtype=EVENT_DTYPE)
+        target_dir = self.directory / self._window
+        target_dir.mkdir(parents=True, exist_ok=True)
+        self._seq += 1
+        target = target_dir / f'{os.getpid()}-{int(time.time() * 1000)}-{self._seq}.npy'
+        # Write to a temp name and rename so readers never see a partial chunk.
+        tmp = target.with_suffix('.tmp')
+        with open(tmp, 'wb') as fh:
+            np.save(fh, chunk, allow_pickle=False)
+        os.replace(tmp, target)
+        self._rows = []
+        self._first_ts = None
+
+
+def iter_chunks(directory=None, since: Optional[str] = None, until: Optional[str] = None,
+                mmap: bool = True) -> Iterator[np.ndarray]:
+    """Yield record arrays for every chunk, oldest window first.
+
+    `since`/`until` are window names (WINDOW_FORMAT) and are inclusive.
+    Chunks are memory-mapped by default so streaming a large log stays cheap.
+    """
+    root = Path(directory) if directory else _log_dir()
+    if not root.exists():
+        return
+    for window_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        if since and window_dir.name < since:
+            continue
+        if until and window_dir.name > until:
+            continue
+        for chunk_path in sorted(window_dir.glob('*.npy')):
+            yield np.load(chunk_path, mmap_mode='r' if mmap else None, allow_pickle=False)
+
+
+def load_events(directory=None, since: Optional[str] = None, until: Optional[str] = None) -> np.ndarray:
+    """Concatenate all matching chunks into a single record array."""
+    chunks = list(iter_chunks(directory, since=since, until=until, mmap=True))
+    if not chunks:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    return np.concatenate(chunks)
+
+
+engagement_log = EngagementLog()
+atexit.register(engagement_log.flush)
+
+
+def record_metrics(user_id, metrics: Iterable[dict]):
+    """Append a batch of metric dicts as sent by the client; never raises."""
+    try:
+        engagement_log.append(user_id, metrics)
+    except Exception as e:
+        print(f"record_metrics: failed to append engagement events: {e}")
@@ -1,17 +1,20 @@
 """Recommendation helper for Posts app.
 
-This module exposes next_clip(user_data, count=1, exclude_ids=None)
+This module exposes next_clip(user_data, count=1, exclude_ids=None, request=None)
 which returns a list of clip dictionaries with the fields the frontend
-expects: id, caption, clipUrl, likeCount, created_at, categories.
+expects: id, caption, clipUrl, likeCount, created_at, categories, plus the
+rendition URLs (absolute when the request is passed).
 
 It randomly selects between Metadata, Trending, or Model based on weights,
 then fetches clips based on the selected categories.
 """
-from typing import List, Iterable, Optional
+from typing import TYPE_CHECKING, List, Iterable, Optional
 import random
-import pandas as pd
 from django.db.models import Count, Q
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 def load_model():
     import os
@@ -27,6 +30,8 @@ def load_model():
 
 
 def Metadata(user_data):
+    import pandas as pd
+
     if user_data is None or (isinstance(user_data, pd.DataFrame) and user_data.empty):
         return []
     try:
@@ -65,7 +70,7 @@ def Model(user_data):
         return []
 
 
-def clips(top_categories, count=1, exclude_ids=None):
+def clips(top_categories, count=1, exclude_ids=None, request=None):
     """Fetch clips from database based on top_categories."""
     from features.models import Clip
 
@@ -83,6 +88,7 @@ def clips(top_categories, count=1, exclude_ids=None):
             'likeCount': clip_obj.likeCount,
             'created_at': clip_obj.created_at.isoformat() if getattr(clip_obj, 'created_at', None) is not None else None,
             'categories': categories,
+            **clip_obj.media_urls(request),
         }
     # If no categories provided, return the most recent clips (excluding requested ids)
     if not top_categories:
@@ -124,7 +130,8 @@ def clips(top_categories, count=1, exclude_ids=None):
     return [format_clip(c) for c in clips_list]
 
 
-def next_clip(user_data: Optional[pd.DataFrame], count: int = 1, exclude_ids: Optional[Iterable[int]] = None):
+def next_clip(user_data: Optional["pd.DataFrame"], count: int = 1, exclude_ids: Optional[Iterable[int]] = None,
+              request=None):
     """Return a tuple (clips_list, method_name, top_categories).
 
     This makes it possible for callers to know which selection strategy
@@ -139,13 +146,13 @@ def next_clip(user_data: Optional[pd.DataFrame], count: int = 1, exclude_ids: Op
         top_categories = selected(user_data)
         method_name = selected.__name__
         print("returned data:", top_categories, method_name)
-        return clips(top_categories, count, exclude_ids), method_name, top_categories
+        return clips(top_categories, count, exclude_ids, request), method_name, top_categories
     except Exception as e:
         print(f"Error in next_clip selection: {e}, falling back to Metadata")
         try:
             top_categories = Metadata(user_data)
             method_name = 'Metadata(fallback)'
-            return clips(top_categories, count, exclude_ids), method_name, top_categories
+            return clips(top_categories, count, exclude_ids, request), method_name, top_categories
         except Exception as e2:
             print(f"Error in fallback: {e2}, returning recent clips")
-            return clips([], count, exclude_ids), 'Recent', []
\ No newline at end of file
+            return clips([], count, exclude_ids, request), 'Recent', []
\ No newline at end of file
@@ -5,15 +5,17 @@ from rest_framework.response import Response
 from django.db import transaction
 
 from .next_clip import next_clip
+from .event_log import record_metrics
 from Posts.models import UserMetadata
 from features.models import VideoCategory
 from accounts.models import UserProfile
-import pandas as pd
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def get_next_clip(request):
+    import pandas as pd  # deferred: pandas adds noticeably to worker startup
+
     # Use authenticated user
     user = request.user
     if not user or not getattr(user, 'id', None):
@@ -86,7 +88,7 @@ def get_next_clip(request):
         pass
 
     try:
-        result, method_used, top_categories = next_clip(user_data, count=count, exclude_ids=exclude_ids)
+        result, method_used, top_categories = next_clip(user_data, count=count, exclude_ids=exclude_ids, request=request)
         # Log which selection method was used and the categories chosen
         print(f"next_clip selected method: {method_used}; categories: {top_categories}")
     except Exception as e:
@@ -133,6 +135,9 @@ def sendVideoMetrics(request):
     
     if not metrics_data:
         return Response({'error': 'No metrics data provided.'}, status=400)
+
+    # Keep the raw events for offline training before they are folded into weights
+    record_metrics(user.id, metrics_data)
     
     # Print the metrics data to backend console/logs
     print("🔄 RECEIVED VIDEO METRICS FROM USER:", user.username)
@@ -2,17 +2,26 @@ import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
-import chat.routing
 import django
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 django.setup()
+import chat.routing
+import features.routing
+from chat.auth import JWTAuthMiddleware
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AuthMiddlewareStack(
-        URLRouter(
-            chat.routing.websocket_urlpatterns
+        JWTAuthMiddleware(
+            URLRouter(
+                chat.routing.websocket_urlpatterns
+                + features.routing.websocket_urlpatterns
+            )
         )
     ),
 })
+
+from backend.warmup import maybe_warm_up  # noqa: E402
+
+maybe_warm_up()
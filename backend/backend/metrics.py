@@ -0,0 +1,199 @@
+"""In-process request metrics with a Prometheus text exposition endpoint.
+
+RequestMetricsMiddleware records, per URL name:
+  * wall time of the request
+  * number of DB queries executed
+  * time spent inside the DB
+
+into histograms kept in this process. `metrics` renders everything in the
+Prometheus text format (version 0.0.4) so it can be scraped per worker.
+Requests that run more queries than REQUEST_QUERY_BUDGET are logged, which is
+how N+1 regressions show up in production.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+
+DEFAULT_TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_TIME_BUCKETS, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+            if idx < len(self.buckets):
+                series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {k: ([*v[0]], v[1], v[2]) for k, v in self._series.items()}
+        for labelvalues, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, ('le', _format_value(float(bound))))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues, ('le', '+Inf'))
+            lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {_format_value(float(total))}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = dict(self._values)
+        for labelvalues, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def histogram(self, name, documentation, buckets=DEFAULT_TIME_BUCKETS, labelnames=()):
+        return self.register(Histogram(name, documentation, buckets, labelnames))
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def render(self):
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'clipzy_request_duration_seconds', 'Wall time spent handling a request.',
+    labelnames=('view', 'method'),
+)
+REQUEST_QUERIES = REGISTRY.histogram(
+    'clipzy_request_db_queries', 'Database queries executed per request.',
+    buckets=DEFAULT_COUNT_BUCKETS, labelnames=('view', 'method'),
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    'clipzy_request_db_seconds', 'Time spent in the database per request.',
+    labelnames=('view', 'method'),
+)
+QUERY_BUDGET_EXCEEDED = REGISTRY.counter(
+    'clipzy_request_query_budget_exceeded_total', 'Requests that ran more queries than the budget.',
+    labelnames=('view',),
+)
+
+
+class _QueryRecorder:
+    """connection.execute_wrapper hook counting queries and DB time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+def _view_name(request):
+    # The matched route pattern, not the url name: features and comments both
+    # register addComment/getComments. Patterns keep label cardinality bounded.
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.route or match._func_path or 'unnamed'
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.query_budget = int(getattr(settings, 'REQUEST_QUERY_BUDGET', 50))
+
+    def __call__(self, request):
+        recorder = _QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        view = _view_name(request)
+        REQUEST_SECONDS.observe(elapsed, view, request.method)
+        REQUEST_QUERIES.observe(recorder.count, view, request.method)
+        REQUEST_DB_SECONDS.observe(recorder.seconds, view, request.method)
+        if self.query_budget and recorder.count > self.query_budget:
+            QUERY_BUDGET_EXCEEDED.inc(view)
+            print(f"WARNING query budget exceeded: {request.method} {request.path} ({view}) ran "
+                  f"{recorder.count} queries (budget {self.query_budget}), db {recorder.seconds * 1000:.1f}ms, "
+                  f"total {elapsed * 1000:.1f}ms")
+        return response
+
+
+def metrics(request):
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
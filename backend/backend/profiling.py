@@ -0,0 +1,185 @@
+"""On-demand sampled profiling for live workers.
+
+SampledProfilingMiddleware runs a request under cProfile and tracemalloc when
+
+  * the admin switch is on and the request falls inside the sample rate, or
+  * the request carries a valid signed `X-Clipzy-Profile` header
+    (tokens are handed out by `profilingToken`).
+
+The switch lives in PROFILING_DIR/control.json so every worker sees it; each
+worker re-reads it at most every PROFILING_CONTROL_TTL seconds, so when
+profiling is off a request costs one monotonic clock read and a header lookup.
+
+Results are written next to the control file as `<stamp>-<view>-<pid>.prof`
+(load with pstats / snakeviz) and `.tracemalloc` (tracemalloc.Snapshot.load).
+"""
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+
+PROFILE_HEADER = 'HTTP_X_CLIPZY_PROFILE'
+TOKEN_SALT = 'clipzy.profiling'
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def _profiling_dir() -> Path:
+    return Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+def _control_path() -> Path:
+    return _profiling_dir() / 'control.json'
+
+
+def read_control():
+    try:
+        with open(_control_path()) as fh:
+            data = json.load(fh)
+    except (FileNotFoundError, ValueError):
+        data = {}
+    return {
+        'enabled': bool(data.get('enabled', False)),
+        'sample_rate': float(data.get('sample_rate', getattr(settings, 'PROFILING_SAMPLE_RATE', 0.01))),
+    }
+
+
+def write_control(enabled, sample_rate):
+    directory = _profiling_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / 'control.json.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump({'enabled': bool(enabled), 'sample_rate': float(sample_rate)}, fh)
+    os.replace(tmp, _control_path())
+
+
+def make_token(user_id):
+    return signing.dumps({'u': user_id}, salt=TOKEN_SALT)
+
+
+def _valid_token(token):
+    try:
+        signing.loads(token, salt=TOKEN_SALT, max_age=int(getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 3600)))
+        return True
+    except signing.BadSignature:
+        return False
+
+
+class SampledProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.control_ttl = float(getattr(settings, 'PROFILING_CONTROL_TTL', 5))
+        self.tracemalloc_frames = int(getattr(settings, 'PROFILING_TRACEMALLOC_FRAMES', 10))
+        self._control = {'enabled': False, 'sample_rate': 0.0}
+        self._control_checked = float('-inf')
+        # cProfile and tracemalloc are process-global: profile one request at a time.
+        self._busy = threading.Lock()
+
+    def _control_state(self):
+        now = time.monotonic()
+        if now - self._control_checked >= self.control_ttl:
+            self._control_checked = now
+            self._control = read_control()
+        return self._control
+
+    def _should_profile(self, request):
+        token = request.META.get(PROFILE_HEADER)
+        if token:
+            return _valid_token(token)
+        control = self._control_state()
+        return control['enabled'] and random.random() < control['sample_rate']
+
+    def __call__(self, request):
+        if not self._should_profile(request) or not self._busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self._profile(request)
+        finally:
+            self._busy.release()
+
+    def _profile(self, request):
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.tracemalloc_frames)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                self._dump(request, profiler, snapshot)
+            except Exception as e:
+                print(f"SampledProfilingMiddleware: failed to write profile: {e}")
+        return response
+
+    def _dump(self, request, profiler, snapshot):
+        directory = _profiling_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        match = getattr(request, 'resolver_match', None)
+        view = _SAFE_NAME.sub('_', (match.view_name if match else None) or 'unresolved')
+        stem = f"{time.strftime('%Y%m%dT%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{view}-{os.getpid()}"
+        profiler.dump_stats(str(directory / f'{stem}.prof'))
+        snapshot.dump(str(directory / f'{stem}.tracemalloc'))
+
+
+def _list_profiles():
+    directory = _profiling_dir()
+    if not directory.exists():
+        return []
+    files = [p for p in directory.iterdir() if p.suffix in ('.prof', '.tracemalloc')]
+    files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    return [
+        {'name': p.name, 'size': p.stat().st_size, 'modified': p.stat().st_mtime}
+        for p in files
+    ]
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAdminUser])
+def profilingStatus(request):
+    """GET: switch state and recorded profiles. POST { "enabled": bool, "sample_rate": float }."""
+    if request.method == 'POST':
+        control = read_control()
+        enabled = request.data.get('enabled', control['enabled'])
+        if isinstance(enabled, str):
+            enabled = enabled.lower() in ('1', 'true', 'yes', 'on')
+        try:
+            sample_rate = float(request.data.get('sample_rate', control['sample_rate']))
+        except (TypeError, ValueError):
+            return Response({'error': 'sample_rate must be a number'}, status=400)
+        if not 0 <= sample_rate <= 1:
+            return Response({'error': 'sample_rate must be between 0 and 1'}, status=400)
+        write_control(enabled, sample_rate)
+    return Response({**read_control(), 'profiles': _list_profiles()})
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def profilingToken(request):
+    """Return a signed value for the X-Clipzy-Profile header."""
+    return Response({'header': 'X-Clipzy-Profile', 'token': make_token(request.user.id)})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def downloadProfile(request, name):
+    path = _profiling_dir() / name
+    if name != Path(name).name or path.suffix not in ('.prof', '.tracemalloc') or not path.exists():
+        raise Http404('Profile not found')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
@@ -66,6 +66,7 @@ INSTALLED_APPS = [
     "chat",
     'features',
     'Posts',
+    'comments',
 ]
 
 ASGI_APPLICATION = "backend.asgi.application"
@@ -87,6 +88,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'backend.metrics.RequestMetricsMiddleware',
+    'backend.profiling.SampledProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -163,7 +166,130 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded/generated media (clip posters, sprites and previews)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Engagement event log (see Posts/event_log.py)
+# Raw video metrics are appended here as NumPy record-array chunks, rolled by time.
+
+ENGAGEMENT_LOG_DIR = Path(os.getenv('ENGAGEMENT_LOG_DIR', BASE_DIR / 'engagement_log'))
+ENGAGEMENT_LOG_ROLL_SECONDS = int(os.getenv('ENGAGEMENT_LOG_ROLL_SECONDS', 3600))
+ENGAGEMENT_LOG_FLUSH_ROWS = int(os.getenv('ENGAGEMENT_LOG_FLUSH_ROWS', 512))
+ENGAGEMENT_LOG_FLUSH_SECONDS = float(os.getenv('ENGAGEMENT_LOG_FLUSH_SECONDS', 60))
+
+
+# Request metrics (see backend/metrics.py)
+# Requests running more DB queries than this are logged as likely N+1 regressions.
+
+REQUEST_QUERY_BUDGET = int(os.getenv('REQUEST_QUERY_BUDGET', 50))
+
+
+# Sampled profiling (see backend/profiling.py)
+# The on/off switch and sample rate are toggled at runtime by admins via /profiling/.
+
+PROFILING_DIR = Path(os.getenv('PROFILING_DIR', BASE_DIR / 'profiles'))
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.01))
+PROFILING_CONTROL_TTL = float(os.getenv('PROFILING_CONTROL_TTL', 5))
+PROFILING_TOKEN_MAX_AGE = int(os.getenv('PROFILING_TOKEN_MAX_AGE', 3600))
+PROFILING_TRACEMALLOC_FRAMES = int(os.getenv('PROFILING_TRACEMALLOC_FRAMES', 10))
+
+
+# Startup (see backend/warmup.py)
+# Heavy dependencies load on first use; set WARMUP_ON_STARTUP=1 to load them before serving.
+
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', '0') == '1'
+WARMUP_TARGETS = [
+    'pandas',
+    'cv2',
+    'features.classifiers.get_classifier',
+]
+
+
+# Comment moderation (see comments/moderation.py)
+# One `manage.py moderation_server` per host owns the model; workers talk to it over MODERATION_SOCKET.
+# MODERATION_FALLBACK when it is unreachable: reject, local or allow.
+
+MODERATION_SERVER_ENABLED = os.getenv('MODERATION_SERVER_ENABLED', '1') == '1'
+MODERATION_SOCKET = Path(os.getenv('MODERATION_SOCKET', BASE_DIR / 'moderation.sock'))
+MODERATION_TIMEOUT = float(os.getenv('MODERATION_TIMEOUT', 2.0))
+MODERATION_FALLBACK = os.getenv('MODERATION_FALLBACK', 'reject')
+MODERATION_MODEL_PATH = Path(os.getenv('MODERATION_MODEL_PATH', BASE_DIR / 'comments' / 'hate_speech'))
+# CPU inference: int8 dynamic quantization of Linear layers, and torch threads per process (0 = torch default)
+MODERATION_QUANTIZE = os.getenv('MODERATION_QUANTIZE', '0') == '1'
+MODERATION_TORCH_THREADS = int(os.getenv('MODERATION_TORCH_THREADS', 0))
+# Micro-batching: concurrent texts share one forward pass of up to this many, waiting at most this long
+MODERATION_BATCH_MAX_SIZE = int(os.getenv('MODERATION_BATCH_MAX_SIZE', 32))
+MODERATION_BATCH_MAX_WAIT_MS = float(os.getenv('MODERATION_BATCH_MAX_WAIT_MS', 5))
+# Verdict cache by normalized text; MODERATION_SHARED_CACHE names a CACHES alias shared across workers
+MODERATION_CACHE_ENABLED = os.getenv('MODERATION_CACHE_ENABLED', '1') == '1'
+MODERATION_CACHE_SIZE = int(os.getenv('MODERATION_CACHE_SIZE', 10000))
+MODERATION_CACHE_TTL = int(os.getenv('MODERATION_CACHE_TTL', 3600))
+MODERATION_SHARED_CACHE = os.getenv('MODERATION_SHARED_CACHE') or None
+
+
+# Chat (see chat/write_buffer.py)
+# Messages sent over WebSockets are written with one bulk_create per batch / flush interval.
+
+CHAT_WRITE_BATCH_SIZE = int(os.getenv('CHAT_WRITE_BATCH_SIZE', 100))
+CHAT_WRITE_FLUSH_MS = float(os.getenv('CHAT_WRITE_FLUSH_MS', 10))
+
+
+# Background clip processing (see features/jobs.py)
+
+CLIP_JOB_WORKERS = int(os.getenv('CLIP_JOB_WORKERS', 2))
+CLIP_UPLOAD_TMP_DIR = Path(os.getenv('CLIP_UPLOAD_TMP_DIR', BASE_DIR / 'temp_uploads'))
+CLIP_MAX_UPLOAD_SIZE = int(os.getenv('CLIP_MAX_UPLOAD_SIZE', 200 * 1024 * 1024))
+# Resumable uploads: largest accepted chunk, and how much must arrive before frame sampling starts
+CLIP_UPLOAD_MAX_CHUNK_SIZE = int(os.getenv('CLIP_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024))
+CLIP_UPLOAD_PREFIX_BYTES = int(os.getenv('CLIP_UPLOAD_PREFIX_BYTES', 4 * 1024 * 1024))
+# Open sessions per user, and seconds of inactivity after which a session is aborted
+CLIP_UPLOAD_MAX_OPEN_SESSIONS = int(os.getenv('CLIP_UPLOAD_MAX_OPEN_SESSIONS', 5))
+CLIP_UPLOAD_SESSION_TTL = int(os.getenv('CLIP_UPLOAD_SESSION_TTL', 24 * 3600))
+
+# Frame classification (see features/classifiers.py and features/video_classification.py)
+# CLIP_CLASSIFIER_BACKEND: features.classifiers.GeminiBackend, LocalHeuristicBackend or RecordedResponseBackend
+
+CLIP_CLASSIFIER_BACKEND = os.getenv('CLIP_CLASSIFIER_BACKEND', 'features.classifiers.GeminiBackend')
+CLIP_CLASSIFIER_OPTIONS = {}
+GEMINI_API_KEY = os.getenv('API_KEY')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash-lite')
+
+CLASSIFY_MAX_CONCURRENCY = int(os.getenv('CLASSIFY_MAX_CONCURRENCY', 4))
+CLASSIFY_BATCH_SIZE = int(os.getenv('CLASSIFY_BATCH_SIZE', 1))
+CLASSIFY_RETRIES = int(os.getenv('CLASSIFY_RETRIES', 3))
+CLASSIFY_BACKOFF_SECONDS = float(os.getenv('CLASSIFY_BACKOFF_SECONDS', 0.5))
+# Keyframes: how many frames to sample as candidates, how different two picks must be
+# (L1 distance between colour histograms, 0..2) and the size they are kept at
+KEYFRAME_CANDIDATES = int(os.getenv('KEYFRAME_CANDIDATES', 24))
+KEYFRAME_MIN_DISTANCE = float(os.getenv('KEYFRAME_MIN_DISTANCE', 0.15))
+KEYFRAME_MAX_EDGE = int(os.getenv('KEYFRAME_MAX_EDGE', 768))
+# Classification payloads: JPEG long edge, quality, and whether to send raw bytes instead of base64
+CLASSIFY_ENCODE_MAX_EDGE = int(os.getenv('CLASSIFY_ENCODE_MAX_EDGE', 512))
+CLASSIFY_JPEG_QUALITY = int(os.getenv('CLASSIFY_JPEG_QUALITY', 80))
+CLASSIFY_SEND_RAW_BYTES = os.getenv('CLASSIFY_SEND_RAW_BYTES', '1') == '1'
+
+# Renditions built at upload (see features/renditions.py)
+
+CLIP_POSTER_MAX_EDGE = int(os.getenv('CLIP_POSTER_MAX_EDGE', 480))
+CLIP_SPRITE_TILE_HEIGHT = int(os.getenv('CLIP_SPRITE_TILE_HEIGHT', 120))
+CLIP_PREVIEW_CLIP_ENABLED = os.getenv('CLIP_PREVIEW_CLIP_ENABLED', '0') == '1'
+CLIP_PREVIEW_SECONDS = float(os.getenv('CLIP_PREVIEW_SECONDS', 3))
+CLIP_PREVIEW_FPS = float(os.getenv('CLIP_PREVIEW_FPS', 12))
+CLIP_PREVIEW_MAX_EDGE = int(os.getenv('CLIP_PREVIEW_MAX_EDGE', 320))
+
+# Classification result cache (see features/label_cache.py)
+
+LABEL_CACHE_ENABLED = os.getenv('LABEL_CACHE_ENABLED', '1') == '1'
+LABEL_CACHE_PATH = Path(os.getenv('LABEL_CACHE_PATH', BASE_DIR / 'label_cache.sqlite3'))
+LABEL_CACHE_MAX_VIDEOS = int(os.getenv('LABEL_CACHE_MAX_VIDEOS', 50000))
+LABEL_CACHE_MAX_FRAMES = int(os.getenv('LABEL_CACHE_MAX_FRAMES', 20000))
+LABEL_CACHE_MAX_DISTANCE = int(os.getenv('LABEL_CACHE_MAX_DISTANCE', 6))
+# Bump to invalidate cached labels after a change the classifier fingerprint cannot see
+LABEL_CACHE_VERSION = os.getenv('LABEL_CACHE_VERSION', '1')
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
+from .metrics import metrics
+from .profiling import profilingStatus, profilingToken, downloadProfile
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -8,4 +12,11 @@ urlpatterns = [
     path('chat/', include('chat.urls')),
     path('posts/', include('Posts.urls')),
     path('comments/', include('comments.urls')),  # New line added
-]
\ No newline at end of file
+    path('metrics/', metrics, name='metrics'),
+    path('profiling/', profilingStatus, name='profilingStatus'),
+    path('profiling/token/', profilingToken, name='profilingToken'),
+    path('profiling/<str:name>/', downloadProfile, name='downloadProfile'),
+]
+
+# Serve clip renditions from MEDIA_ROOT during development
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
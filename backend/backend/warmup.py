@@ -0,0 +1,38 @@
+"""Optional warm-up of lazily loaded dependencies.
+
+Heavy libraries (torch/transformers for comment moderation, cv2 for clip
+processing, pandas for recommendations) are imported on first use so that
+workers and manage.py commands start quickly. A long-running server that
+would rather pay that cost before taking traffic sets WARMUP_ON_STARTUP; each
+entry of WARMUP_TARGETS is then imported (module path) or called (dotted path
+to a zero-argument callable) once at startup.
+"""
+import importlib
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def warm_up(targets=None):
+    """Load every target; returns {target: seconds, or an error string}. Never raises."""
+    if targets is None:
+        targets = getattr(settings, 'WARMUP_TARGETS', [])
+    timings = {}
+    for target in targets:
+        start = time.perf_counter()
+        try:
+            try:
+                importlib.import_module(target)
+            except ImportError:
+                import_string(target)()
+            timings[target] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            timings[target] = f'failed: {e}'
+        print(f"warm_up: {target} {timings[target]}")
+    return timings
+
+
+def maybe_warm_up():
+    if getattr(settings, 'WARMUP_ON_STARTUP', False):
+        warm_up()
@@ -1,10 +1,33 @@
+import asyncio
 import json
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from .models import ChatRoom, Message
+from .unread import mark_read, read_event
+from .write_buffer import get_write_buffer
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
+    """Chat room socket: persists sent messages and broadcasts them to the room.
+
+    Connect to ws/chat/<room_id>/?token=<JWT access token> as a participant.
+    Send {"message": "...", "video_id": <clip id, optional>, "client_id": "..."};
+    the sender gets {"type": "ack", "client_id": ..., "id": <message id>, ...}
+    once the message is stored, and everyone in the room gets a "chat_message".
+    Send {"type": "read", "up_to_id": <message id>} to mark the room read; the
+    room gets a "read_receipt" with the reader's remaining unread_count.
+    """
+
     async def connect(self):
         self.room_name = self.scope["url_route"]["kwargs"]["room_name"]
         self.room_group_name = f"chat_{self.room_name}"
+        self.user = self.scope.get("user")
+        self.pending_sends = set()
+
+        if not getattr(self.user, "is_authenticated", False) or not await self.is_participant():
+            await self.close(code=4403)
+            return
 
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -13,28 +36,109 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.accept()
 
     async def disconnect(self, close_code):
+        if getattr(self, "pending_sends", None):
+            await asyncio.gather(*self.pending_sends, return_exceptions=True)
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
+    @database_sync_to_async
+    def is_participant(self):
+        if not self.room_name.isdigit():
+            return False
+        return ChatRoom.objects.filter(id=int(self.room_name), participants=self.user).exists()
+
     async def receive(self, text_data):
-        data = json.loads(text_data)
-        message = data["message"]
-        sender = data["sender"]
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            await self.send_error("Invalid JSON.")
+            return
+        if data.get("type") == "read":
+            await self.receive_read(data)
+            return
+        client_id = data.get("client_id")
+        content = data.get("message", data.get("content"))
+        video_id = data.get("video_id")
+        if video_id is not None:
+            try:
+                video_id = int(video_id)
+            except (TypeError, ValueError):
+                await self.send_error("video_id must be an integer.", client_id)
+                return
+        if not content and video_id is None:
+            await self.send_error("message or video_id required.", client_id)
+            return
+
+        # Not awaited here, so a burst from one socket lands in the same write batch;
+        # the buffer saves (and therefore acks) messages in the order they arrived.
+        task = asyncio.ensure_future(self.persist_and_broadcast(content, video_id, client_id))
+        self.pending_sends.add(task)
+        task.add_done_callback(self.pending_sends.discard)
+
+    async def persist_and_broadcast(self, content, video_id, client_id):
+        try:
+            msg = await get_write_buffer().add(Message(
+                room_id=int(self.room_name), sender_id=self.user.id, content=content, video_id=video_id,
+            ))
+        except Exception:
+            await self.send_error("Message could not be saved.", client_id)
+            return
+
+        timestamp = msg.timestamp.isoformat()
+        await self.send(text_data=json.dumps({
+            "type": "ack",
+            "client_id": client_id,
+            "id": msg.id,
+            "timestamp": timestamp,
+        }))
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 "type": "chat_message",
-                "message": message,
-                "sender": sender
+                "id": msg.id,
+                "message": content,
+                "video": video_id,
+                "sender": self.user.id,
+                "sender_username": self.user.username,
+                "timestamp": timestamp,
+                "client_id": client_id,
             }
         )
 
+    async def receive_read(self, data):
+        try:
+            up_to_id = int(data.get("up_to_id"))
+        except (TypeError, ValueError):
+            await self.send_error("up_to_id must be an integer.")
+            return
+        room_id = int(self.room_name)
+        _, unread_count = await database_sync_to_async(mark_read)(room_id, self.user, up_to_id)
+        await self.channel_layer.group_send(
+            self.room_group_name, read_event(room_id, self.user, up_to_id, unread_count)
+        )
+
+    async def read_receipt(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "read_receipt",
+            "room_id": event["room_id"],
+            "user": event["user"],
+            "up_to_id": event["up_to_id"],
+            "unread_count": event["unread_count"],
+        }))
+
+    async def send_error(self, error, client_id=None):
+        await self.send(text_data=json.dumps({"type": "error", "client_id": client_id, "error": error}))
+
     async def chat_message(self, event):
-        message = event["message"]
-        sender = event["sender"]
         await self.send(text_data=json.dumps({
-            "message": message,
-            "sender": sender
+            "type": "chat_message",
+            "id": event["id"],
+            "message": event["message"],
+            "video": event["video"],
+            "sender": event["sender"],
+            "sender_username": event["sender_username"],
+            "timestamp": event["timestamp"],
+            "client_id": event["client_id"],
         }))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    Message = apps.get_model('chat', 'Message')
+    UnreadCounter = apps.get_model('chat', 'UnreadCounter')
+    memberships = ChatRoom.participants.through.objects.values_list('chatroom_id', 'user_id')
+    rows = (
+        Message.objects.filter(is_read=False)
+        .values('room_id', 'sender_id')
+        .annotate(n=Count('id'))
+    )
+    per_room = {}
+    for row in rows:
+        per_room.setdefault(row['room_id'], []).append((row['sender_id'], row['n']))
+    UnreadCounter.objects.bulk_create(
+        [
+            UnreadCounter(
+                room_id=room_id, user_id=user_id,
+                count=sum(n for sender_id, n in per_room.get(room_id, []) if sender_id != user_id),
+            )
+            for room_id, user_id in memberships.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_message_room_id_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_read_id', models.BigIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='chat.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('room', 'user'), name='chat_unread_room_user_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -12,3 +12,19 @@ class Message(models.Model):
     video = models.ForeignKey("features.Clip", on_delete=models.SET_NULL, null=True, blank=True)  # shared TikTok
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+
+    class Meta:
+        # Finds a room's page of messages by id range; the rows themselves are
+        # still read from the table (the index does not cover the columns).
+        indexes = [models.Index(fields=['room', 'id'], name='chat_message_room_id_idx')]
+
+
+class UnreadCounter(models.Model):
+    """Unread messages from others in `room`, per participant (see chat/unread.py)."""
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name="unread_counters")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="unread_counters")
+    count = models.PositiveIntegerField(default=0)
+    last_read_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['room', 'user'], name='chat_unread_room_user_uniq')]
@@ -1,3 +1,128 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import IntegrityError, OperationalError
+from django.test import TestCase, TransactionTestCase
+
+from features.models import Clip
+
+from .models import ChatRoom, Message, UnreadCounter
+from .unread import mark_read, record_sent
+from . import write_buffer
+from .write_buffer import MessageWriteBuffer
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.carol = User.objects.create_user('carol')
+        self.room = ChatRoom.objects.create()
+        self.room.participants.add(self.alice, self.bob, self.carol)
+
+    def send(self, sender, count=1):
+        messages = [Message.objects.create(room=self.room, sender=sender, content='hi') for _ in range(count)]
+        record_sent(messages)
+        return messages
+
+    def unread(self, user):
+        return UnreadCounter.objects.get(room=self.room, user=user).count
+
+    def test_record_sent_counts_for_everyone_but_the_sender(self):
+        self.send(self.alice, 2)
+        self.send(self.bob)
+
+        self.assertEqual(self.unread(self.alice), 1)
+        self.assertEqual(self.unread(self.bob), 2)
+        self.assertEqual(self.unread(self.carol), 3)
+
+    def test_record_sent_batches_across_senders(self):
+        messages = [
+            Message.objects.create(room=self.room, sender=sender, content='hi')
+            for sender in (self.alice, self.alice, self.bob)
+        ]
+        record_sent(messages)
+
+        self.assertEqual(self.unread(self.carol), 3)
+        self.assertEqual(self.unread(self.alice), 1)
+
+    def test_mark_read_up_to_a_message(self):
+        first, second, third = self.send(self.alice, 3)
+
+        marked, unread = mark_read(self.room.id, self.carol, second.id)
+
+        self.assertEqual((marked, unread), (2, 1))
+        self.assertEqual(self.unread(self.carol), 1)
+        self.assertEqual(self.unread(self.bob), 3)
+        self.assertFalse(Message.objects.get(id=third.id).is_read)
+
+    def test_mark_read_ignores_own_messages_and_never_moves_back(self):
+        self.send(self.carol)
+        latest = self.send(self.alice, 2)[-1]
+
+        self.assertEqual(mark_read(self.room.id, self.carol, latest.id), (2, 0))
+        self.assertEqual(mark_read(self.room.id, self.carol, latest.id - 1), (0, 0))
+        self.assertEqual(UnreadCounter.objects.get(room=self.room, user=self.carol).last_read_id, latest.id)
+
+
+# Foreign keys are checked at commit, so the fallback needs real transactions
+class MessageWriteBufferTests(TransactionTestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.room = ChatRoom.objects.create()
+        self.room.participants.add(self.alice, self.bob)
+        self.clip = Clip.objects.create(caption='c', clipUrl='http://example.com/c.mp4', uploader=self.alice)
+
+    def message(self, content='hi', **kwargs):
+        return Message(room=self.room, sender=self.alice, content=content, **kwargs)
+
+    def test_bad_row_fails_alone(self):
+        deleted_clip_id = self.clip.id + 1000
+        results = MessageWriteBuffer._write([
+            self.message(video=self.clip),
+            self.message(video_id=deleted_clip_id),
+            self.message(),
+        ])
+
+        self.assertIsInstance(results[1], IntegrityError)
+        self.assertTrue(results[0].pk and results[2].pk)
+        self.assertEqual(Message.objects.count(), 2)
+        self.assertEqual(UnreadCounter.objects.get(room=self.room, user=self.bob).count, 2)
+
+    def test_add_resolves_each_caller_from_one_batch(self):
+        buffer = MessageWriteBuffer(batch_size=2, flush_ms=1000)
+
+        async def send_two():
+            return await asyncio.gather(buffer.add(self.message()), buffer.add(self.message(content='yo')))
+
+        first, second = async_to_sync(send_two)()
+
+        self.assertEqual([first.content, second.content], ['hi', 'yo'])
+        self.assertLess(first.pk, second.pk)
+        self.assertEqual(UnreadCounter.objects.get(room=self.room, user=self.bob).count, 2)
+
+    def test_database_error_fails_every_caller(self):
+        buffer = MessageWriteBuffer(batch_size=10, flush_ms=1)
+
+        async def send_two():
+            return await asyncio.gather(
+                buffer.add(self.message()), buffer.add(self.message(content='yo')), return_exceptions=True,
+            )
+
+        with mock.patch.object(MessageWriteBuffer, '_write', side_effect=OperationalError('db down')):
+            results = async_to_sync(send_two)()
+
+        self.assertEqual([type(r) for r in results], [OperationalError, OperationalError])
+        self.assertFalse(buffer._tasks)
+
+    def test_buffers_of_closed_loops_are_dropped(self):
+        async def use_buffer():
+            write_buffer.get_write_buffer()
+
+        asyncio.run(use_buffer())
+        asyncio.run(use_buffer())
+
+        self.assertEqual(len(write_buffer._buffers), 1)
@@ -0,0 +1,81 @@
+"""Denormalized unread counts and read receipts.
+
+Every (room, participant) pair has an UnreadCounter. Sending messages adds
+to the counters of the other participants (one UPDATE per room and sender
+in the batch); marking a room read up to a message id flips is_read on all
+earlier messages from others with one bulk UPDATE and recomputes the counter
+from the few messages after that id. Read events go to the room's WebSocket
+group (chat_<room id>) so other devices and the other side update badges.
+"""
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import F
+
+from .models import ChatRoom, Message, UnreadCounter
+
+
+def room_group_name(room_id):
+    return f"chat_{room_id}"
+
+
+def record_sent(messages):
+    """Count freshly saved `messages` as unread for everyone but their senders.
+
+    Call inside the transaction that wrote them.
+    """
+    sent = Counter((m.room_id, m.sender_id) for m in messages)
+    if not sent:
+        return
+    room_ids = {room_id for room_id, _ in sent}
+    memberships = ChatRoom.participants.through.objects.filter(chatroom_id__in=room_ids).values_list('chatroom_id', 'user_id')
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(room_id=room_id, user_id=user_id) for room_id, user_id in memberships],
+        ignore_conflicts=True,
+    )
+    for (room_id, sender_id), count in sent.items():
+        UnreadCounter.objects.filter(room_id=room_id).exclude(user_id=sender_id).update(count=F('count') + count)
+
+
+def mark_read(room_id, user, up_to_id):
+    """Mark messages from others up to `up_to_id` read; returns (marked, unread_count)."""
+    with transaction.atomic():
+        counter, _ = UnreadCounter.objects.select_for_update().get_or_create(room_id=room_id, user=user)
+        marked = (
+            Message.objects.filter(room_id=room_id, id__lte=up_to_id, is_read=False)
+            .exclude(sender=user)
+            .update(is_read=True)
+        )
+        counter.last_read_id = max(counter.last_read_id, up_to_id)
+        counter.count = (
+            Message.objects.filter(room_id=room_id, id__gt=counter.last_read_id, is_read=False)
+            .exclude(sender=user)
+            .count()
+        )
+        counter.save(update_fields=['last_read_id', 'count'])
+    return marked, counter.count
+
+
+def read_event(room_id, user, up_to_id, unread_count):
+    return {
+        "type": "read_receipt",
+        "room_id": room_id,
+        "user": user.id,
+        "up_to_id": up_to_id,
+        "unread_count": unread_count,
+    }
+
+
+def broadcast_read(room_id, user, up_to_id, unread_count):
+    """Send a read receipt to the room's sockets (from sync code)."""
+    try:
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        async_to_sync(channel_layer.group_send)(
+            room_group_name(room_id), read_event(room_id, user, up_to_id, unread_count)
+        )
+    except Exception as e:
+        print(f"broadcast_read: could not notify room {room_id}: {e}")
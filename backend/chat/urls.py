@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import getChats, createRoom, getMessages, sendMessage,getUserId 
+from .views import getChats, createRoom, getMessages, sendMessage,getUserId, markRead
 
 urlpatterns = [
     path('getChats/', getChats, name='getChats'),
@@ -7,4 +7,5 @@ urlpatterns = [
     path('getMessages/<int:room_id>/', getMessages, name='getMessages'),
     path('sendMessage/', sendMessage, name='sendMessage'),
     path('getUserId/', getUserId, name='getUserId'),
+    path('markRead/', markRead, name='markRead'),
 ]
@@ -4,8 +4,12 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
 from features.models import Follows
-from .models import ChatRoom, Message
+from .models import ChatRoom, Message, UnreadCounter
+from .unread import broadcast_read, mark_read, record_sent
 from accounts.models import UserProfile
 
 
@@ -28,7 +32,9 @@ def sendMessage(request):
             video = Clip.objects.get(id=video_id)
         except Clip.DoesNotExist:
             pass
-    msg = Message.objects.create(room=room, sender=user, content=content, video=video)
+    with transaction.atomic():
+        msg = Message.objects.create(room=room, sender=user, content=content, video=video)
+        record_sent([msg])
     return Response({
         'id': msg.id,
         'sender': msg.sender.username,
@@ -39,76 +45,181 @@ def sendMessage(request):
     }, status=status.HTTP_201_CREATED)
 
 
+MESSAGES_PAGE_SIZE = 50
+MESSAGES_MAX_PAGE_SIZE = 200
+
+
+def clip_previews(clip_ids, request):
+    """{clip_id: preview} for the clips shared in a page of messages, in one query."""
+    if not clip_ids:
+        return {}
+    clips = Clip.objects.filter(id__in=clip_ids).only('id', 'caption', 'clipUrl', 'poster', 'sprite', 'preview')
+    return {
+        clip.id: {'id': clip.id, 'caption': clip.caption, 'clipUrl': clip.clipUrl, **clip.media_urls(request)}
+        for clip in clips
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def getMessages(request, room_id):
+    """A page of a room's messages, oldest first.
+
+    Query params (message ids as cursors):
+      before=<id>  older history: the `limit` messages just before <id>
+      after=<id>   delta sync: messages newer than <id> (the client's last seen)
+      limit        page size, default 50, at most 200
+    Without a cursor the latest `limit` messages are returned. `has_more` says
+    whether another page exists in the requested direction.
+    """
     user = request.user
-    try:
-        room = ChatRoom.objects.get(id=room_id, participants=user)
-    except ChatRoom.DoesNotExist:
+    if not ChatRoom.objects.filter(id=room_id, participants=user).exists():
         return Response({'error': 'Chat room not found or access denied.'}, status=404)
-    messages = Message.objects.filter(room=room).order_by('timestamp')
+    try:
+        limit = int(request.GET.get('limit', MESSAGES_PAGE_SIZE))
+        before = request.GET.get('before')
+        after = request.GET.get('after')
+        before = int(before) if before else None
+        after = int(after) if after else None
+    except ValueError:
+        return Response({'error': 'before, after and limit must be integers.'}, status=400)
+    limit = max(1, min(limit, MESSAGES_MAX_PAGE_SIZE))
+
+    # Served by the (room, id) index; ids grow with time
+    messages = Message.objects.filter(room_id=room_id).only(
+        'id', 'sender_id', 'content', 'video_id', 'timestamp', 'is_read'
+    )
+    if after is not None:
+        page = list(messages.filter(id__gt=after).order_by('id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+    else:
+        if before is not None:
+            messages = messages.filter(id__lt=before)
+        page = list(messages.order_by('-id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit][::-1]
+
+    previews = clip_previews({msg.video_id for msg in page if msg.video_id}, request)
     messages_data = [
         {
             'id': msg.id,
-            'sender': msg.sender.id,
+            'sender': msg.sender_id,
             'content': msg.content,
-            'video': msg.video.id if msg.video else None,
+            'video': msg.video_id,
+            'video_preview': previews.get(msg.video_id),
             'timestamp': msg.timestamp,
             'is_read': msg.is_read
         }
-        for msg in messages
+        for msg in page
     ]
-    return Response({'messages': messages_data})
+    return Response({'messages': messages_data, 'has_more': has_more})
+
+CHATS_PAGE_SIZE = 20
+CHATS_MAX_PAGE_SIZE = 100
+
+
+def user_card(u):
+    """Participant / followed-user entry; profile rows must be prefetched."""
+    profiles = list(u.profile.all())
+    if not profiles:
+        return {'user_id': u.id, 'username': u.username}
+    return {
+        'user_id': u.id,
+        'username': u.username,
+        'profile_pic': profiles[0].profile_pic,
+        'name': profiles[0].name,
+    }
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def getChats(request):
+    """The user's inbox, most recently active room first.
+
+    Each room carries its participants, the last message and the unread count
+    (messages from others not yet read). Paginated with limit (default 20, at
+    most 100) and offset; the first page also lists followed users. A fixed
+    number of queries regardless of how many rooms or participants there are.
+    """
     user = request.user
-    chat_rooms = ChatRoom.objects.filter(participants=user)
-    rooms_data = []
-    for room in chat_rooms:
-        participants = []
-        for u in room.participants.all():
-            try:
-                up = UserProfile.objects.get(user=u)
-                participants.append({
-                    'user_id': u.id,
-                    'username': u.username,
-                    'profile_pic': up.profile_pic,
-                    'name': up.name,
-                })
-            except UserProfile.DoesNotExist:
-                participants.append({'user_id': u.id, 'username': u.username})
+    try:
+        limit = max(1, min(int(request.GET.get('limit', CHATS_PAGE_SIZE)), CHATS_MAX_PAGE_SIZE))
+        offset = max(0, int(request.GET.get('offset', 0)))
+    except ValueError:
+        return Response({'error': 'limit and offset must be integers.'}, status=400)
+
+    profiled_users = User.objects.only('id', 'username').prefetch_related(
+        Prefetch('profile', queryset=UserProfile.objects.only('id', 'user_id', 'name', 'profile_pic'))
+    )
+    rooms = list(
+        ChatRoom.objects.filter(participants=user)
+        .annotate(
+            last_message_id=Max('messages__id'),
+            unread_count=Coalesce(
+                Subquery(UnreadCounter.objects.filter(room=OuterRef('pk'), user=user).values('count')[:1]),
+                Value(0),
+            ),
+        )
+        .order_by(F('last_message_id').desc(nulls_last=True), '-id')
+        .prefetch_related(Prefetch('participants', queryset=profiled_users))
+        [offset:offset + limit + 1]
+    )
+    has_more = len(rooms) > limit
+    rooms = rooms[:limit]
 
+    last_ids = [room.last_message_id for room in rooms if room.last_message_id]
+    last_messages = Message.objects.filter(id__in=last_ids).only(
+        'id', 'sender_id', 'content', 'video_id', 'timestamp', 'is_read'
+    ).in_bulk()
+    rooms_data = []
+    for room in rooms:
+        last = last_messages.get(room.last_message_id)
         rooms_data.append({
             'roomExists': True,
             'room_id': room.id,
             'room_name': room.name,
-            'participants': participants,
+            'participants': [user_card(u) for u in room.participants.all()],
+            'last_message': {
+                'id': last.id,
+                'sender': last.sender_id,
+                'content': last.content,
+                'video': last.video_id,
+                'timestamp': last.timestamp,
+                'is_read': last.is_read,
+            } if last else None,
+            'last_activity': last.timestamp if last else None,
+            'unread_count': room.unread_count,
         })
 
-    # always include list of users the current user is following so the client can show
-    # people the user follows even if there are chat rooms
-    following_qs = Follows.objects.filter(follower=user).select_related('following')
-    following_users = []
-    for f in following_qs:
-        try:
-            up = UserProfile.objects.get(user=f.following)
-            following_users.append({
-                'user_id': f.following.id,
-                'username': f.following.username,
-                'profile_pic': up.profile_pic,
-                'name': up.name,
-            })
-        except UserProfile.DoesNotExist:
-            following_users.append({
-                'user_id': f.following.id,
-                'username': f.following.username,
-            })
-
-    return Response({"chat_rooms": rooms_data, "following": following_users})
-    
+    response = {"chat_rooms": rooms_data, "has_more": has_more}
+    if offset == 0:
+        # always include list of users the current user is following so the client can show
+        # people the user follows even if there are chat rooms
+        following_qs = Follows.objects.filter(follower=user).select_related('following').prefetch_related(
+            Prefetch('following__profile', queryset=UserProfile.objects.only('id', 'user_id', 'name', 'profile_pic'))
+        )
+        response["following"] = [user_card(f.following) for f in following_qs]
+    return Response(response)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def markRead(request):
+    """Mark a room read up to a message id. Accepts JSON { "room_id": ..., "up_to_id": ... }."""
+    user = request.user
+    try:
+        room_id = int(request.data.get('room_id'))
+        up_to_id = int(request.data.get('up_to_id'))
+    except (TypeError, ValueError):
+        return Response({'error': 'room_id and up_to_id must be integers.'}, status=400)
+    if not ChatRoom.objects.filter(id=room_id, participants=user).exists():
+        return Response({'error': 'Chat room not found or access denied.'}, status=404)
+    marked, unread_count = mark_read(room_id, user, up_to_id)
+    broadcast_read(room_id, user, up_to_id, unread_count)
+    return Response({'room_id': room_id, 'up_to_id': up_to_id, 'marked': marked, 'unread_count': unread_count})
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def createRoom(request):
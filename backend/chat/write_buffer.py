@@ -0,0 +1,113 @@
+"""Batched persistence of chat messages sent over WebSockets.
+
+Every consumer in a worker process shares one MessageWriteBuffer per event
+loop. `add()` queues an unsaved Message and waits; the buffer writes
+everything queued with a single bulk_create once CHAT_WRITE_BATCH_SIZE
+messages are waiting or CHAT_WRITE_FLUSH_MS has passed since the first one,
+then resolves each caller with its saved row (id and timestamp set).
+
+Unread counters of the other participants are bumped in the same
+transaction (chat/unread.py).
+
+If a batch violates a constraint (e.g. a shared clip was deleted meanwhile)
+its rows are retried one by one so only the offending message fails. Any
+other error (database down) fails every message of the batch; callers are
+always resolved.
+"""
+import asyncio
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import Message
+from .unread import record_sent
+
+
+class MessageWriteBuffer:
+    def __init__(self, batch_size=None, flush_ms=None):
+        self.batch_size = int(batch_size or getattr(settings, 'CHAT_WRITE_BATCH_SIZE', 100))
+        self.flush_delay = float(flush_ms if flush_ms is not None else getattr(settings, 'CHAT_WRITE_FLUSH_MS', 10)) / 1000.0
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def add(self, message):
+        """Queue `message` (an unsaved Message) and return it once it is saved."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((message, future))
+        if len(self._pending) >= self.batch_size:
+            self._schedule(0)
+        elif self._timer is None:
+            self._schedule(self.flush_delay)
+        return await future
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(delay, self._start_flush, loop)
+
+    def _start_flush(self, loop):
+        # The loop only keeps weak references to tasks
+        task = loop.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            results = await database_sync_to_async(self._write)([m for m, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            print(f"MessageWriteBuffer: could not save {len(batch)} messages: {e}")
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _write(messages):
+        try:
+            with transaction.atomic():
+                saved = Message.objects.bulk_create(messages)
+                record_sent(saved)
+                return saved
+        except IntegrityError:
+            pass
+        results = []
+        for message in messages:
+            message.pk = None
+            try:
+                with transaction.atomic():
+                    message.save()
+                    record_sent([message])
+                results.append(message)
+            except IntegrityError as e:
+                results.append(e)
+        return results
+
+
+_buffers = {}
+
+
+def get_write_buffer():
+    """The buffer for the running event loop."""
+    loop = asyncio.get_running_loop()
+    buffer = _buffers.get(loop)
+    if buffer is None:
+        # Drop buffers of loops that have since closed (e.g. async_to_sync calls)
+        for closed in [other for other in _buffers if other.is_closed()]:
+            del _buffers[closed]
+        buffer = _buffers[loop] = MessageWriteBuffer()
+    return buffer
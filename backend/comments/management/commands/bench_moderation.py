@@ -0,0 +1,90 @@
+"""Compare the fp32 moderation model with its int8-quantized variant.
+
+    python manage.py bench_moderation sample.jsonl --batch-size 8 --threads 2
+
+The sample is JSONL ({"text": ..., "label": ...}) or CSV with text,label
+columns; labels are optional and use the names in comments.moderation
+(acceptable, inappropriate, offensive, violent). Both models run the same
+batches under torch.inference_mode; the command prints as JSON per-batch
+latency, texts/second, accuracy against the labels, and how often the int8
+verdict agrees with fp32.
+"""
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from comments.moderation import load_pipeline, run_pipeline
+
+
+def load_sample(path):
+    with open(path, newline='', encoding='utf-8') as fh:
+        if path.endswith('.csv'):
+            rows = list(csv.DictReader(fh))
+        else:
+            rows = [json.loads(line) for line in fh if line.strip()]
+    return [(r['text'], r.get('label') or None) for r in rows if r.get('text')]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark fp32 vs int8-quantized comment moderation: latency and agreement.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sample', help='Labeled sample, .jsonl or .csv.')
+        parser.add_argument('--batch-size', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=0, help='torch threads (0 = torch default).')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed passes; the fastest is reported.')
+        parser.add_argument('--limit', type=int, default=None)
+
+    def handle(self, *args, **opts):
+        try:
+            sample = load_sample(opts['sample'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not read sample: {e}')
+        if opts['limit']:
+            sample = sample[:opts['limit']]
+        if not sample:
+            raise CommandError('Sample is empty.')
+        texts = [text for text, _ in sample]
+        size = max(1, opts['batch_size'])
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+
+        results = {}
+        predictions = {}
+        for name, quantize in (('fp32', False), ('int8', True)):
+            pipe = load_pipeline(quantize=quantize, threads=opts['threads'])
+            run_pipeline(batches[0], pipe)  # warm-up
+            best = None
+            for _ in range(max(1, opts['repeat'])):
+                labels, timings = [], []
+                for batch in batches:
+                    start = time.perf_counter()
+                    labels.extend(run_pipeline(batch, pipe))
+                    timings.append(time.perf_counter() - start)
+                if best is None or sum(timings) < sum(best):
+                    best = timings
+            predictions[name] = labels
+            best.sort()
+            results[name] = {
+                'texts_per_second': round(len(texts) / sum(best), 2),
+                'batch_p50_ms': round(best[len(best) // 2] * 1000, 3),
+                'batch_p99_ms': round(best[min(len(best) - 1, int(len(best) * 0.99))] * 1000, 3),
+                'accuracy': self._accuracy(labels, sample),
+            }
+
+        agree = sum(a == b for a, b in zip(predictions['fp32'], predictions['int8']))
+        self.stdout.write(json.dumps({
+            'texts': len(texts),
+            'batch_size': size,
+            'threads': opts['threads'] or 'default',
+            **results,
+            'agreement': round(agree / len(texts), 4),
+            'speedup': round(results['int8']['texts_per_second'] / results['fp32']['texts_per_second'], 2),
+        }, indent=2))
+
+    def _accuracy(self, labels, sample):
+        labeled = [(pred, gold) for pred, (_, gold) in zip(labels, sample) if gold]
+        if not labeled:
+            return None
+        return round(sum(pred == gold for pred, gold in labeled) / len(labeled), 4)
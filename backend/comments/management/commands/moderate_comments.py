@@ -0,0 +1,100 @@
+"""Publish or reject pending comments in batches.
+
+    python manage.py moderate_comments            # run forever
+    python manage.py moderate_comments --once     # drain the backlog and exit
+
+Claims up to --batch-size pending comments (oldest first) in a short
+transaction: the rows are locked with SKIP LOCKED only long enough to stamp
+moderation_claimed_at, so several workers can run side by side without
+holding locks during the model call. The batch is then classified in one
+call through comments.moderation and the outcome written back with a single
+bulk update: 'acceptable' comments are published, everything else rejected.
+
+MODERATION_FALLBACK does not apply here: if moderation is unavailable the
+claims are released, the batch stays pending and is retried after
+--retry-delay seconds. A claim older than --claim-timeout (worker killed
+mid-batch) is picked up again by the next worker.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, models, transaction
+from django.utils import timezone
+
+from comments.moderation import ModerationUnavailable, classify_texts
+from features.models import Comment
+
+
+def claim_batch(batch_size, claim_timeout):
+    """Mark up to batch_size unclaimed (or stale) pending comments as ours."""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            Comment.objects.select_for_update(skip_locked=True)
+            .filter(status=Comment.STATUS_PENDING)
+            .filter(
+                models.Q(moderation_claimed_at__isnull=True)
+                | models.Q(moderation_claimed_at__lt=now - timedelta(seconds=claim_timeout))
+            )
+            .order_by('id')[:batch_size]
+        )
+        if batch:
+            Comment.objects.filter(id__in=[c.id for c in batch]).update(moderation_claimed_at=now)
+    for comment in batch:
+        comment.moderation_claimed_at = now
+    return batch
+
+
+def moderate_batch(batch_size, claim_timeout=300):
+    """Moderate one batch of pending comments; returns how many were decided."""
+    batch = claim_batch(batch_size, claim_timeout)
+    if not batch:
+        return 0
+    try:
+        labels = classify_texts([c.comment for c in batch], fallback=False)
+    except Exception:
+        Comment.objects.filter(id__in=[c.id for c in batch]).update(moderation_claimed_at=None)
+        raise
+    for comment, label in zip(batch, labels):
+        comment.moderation_label = label
+        comment.moderation_claimed_at = None
+        comment.status = Comment.STATUS_PUBLISHED if label == 'acceptable' else Comment.STATUS_REJECTED
+    Comment.objects.bulk_update(batch, ['status', 'moderation_label', 'moderation_claimed_at'])
+    return len(batch)
+
+
+class Command(BaseCommand):
+    help = 'Background worker that moderates pending comments in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=64)
+        parser.add_argument('--interval', type=float, default=0.5, help='Seconds to sleep when nothing is pending.')
+        parser.add_argument('--retry-delay', type=float, default=5.0)
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is pending.')
+        parser.add_argument(
+            '--claim-timeout', type=float, default=300.0,
+            help='Seconds after which another worker may take over a claimed batch.',
+        )
+
+    def handle(self, *args, **opts):
+        batch_size = max(1, opts['batch_size'])
+        total = 0
+        while True:
+            close_old_connections()
+            try:
+                done = moderate_batch(batch_size, opts['claim_timeout'])
+            except ModerationUnavailable as e:
+                self.stderr.write(f'moderation unavailable, retrying in {opts["retry_delay"]}s: {e}')
+                if opts['once']:
+                    break
+                time.sleep(opts['retry_delay'])
+                continue
+            total += done
+            if done:
+                self.stdout.write(f'moderated {done} comments ({total} total)')
+                continue
+            if opts['once']:
+                break
+            time.sleep(opts['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Moderated {total} comments.'))
@@ -0,0 +1,106 @@
+"""Serve the hate-speech model to every worker on this host.
+
+    python manage.py moderation_server
+    python manage.py moderation_server --socket /run/clipzy/moderation.sock
+
+Loads the pipeline once, then answers newline-delimited JSON requests on a
+Unix socket (protocol in comments/moderation.py). Connections are handled on
+threads and their texts are micro-batched into shared forward passes.
+--metrics-port serves batch-size / queue-wait histograms for Prometheus.
+"""
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.metrics import REGISTRY
+from comments.moderation import classify_local, get_pipeline
+
+
+class ModerationHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                texts = json.loads(line)['texts']
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    raise ValueError('texts must be a list of strings')
+                reply = {'labels': classify_local(texts)}
+            except Exception as e:
+                reply = {'error': str(e)}
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+            self.wfile.flush()
+
+
+class ModerationServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    # Every web worker connects here; the default backlog of 5 refuses bursts with EAGAIN
+    request_queue_size = 256
+
+    def __init__(self, path):
+        super().__init__(path, ModerationHandler)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _socket_in_use(path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+    return True
+
+
+class Command(BaseCommand):
+    help = 'Run the shared comment moderation model server on a Unix socket.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=None, help='Socket path (default: MODERATION_SOCKET).')
+        parser.add_argument('--metrics-port', type=int, default=None, help='Serve Prometheus metrics on this localhost port.')
+
+    def handle(self, *args, **opts):
+        path = Path(opts['socket'] or getattr(settings, 'MODERATION_SOCKET', Path(settings.BASE_DIR) / 'moderation.sock'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            if not stat.S_ISSOCK(path.stat().st_mode):
+                raise CommandError(f'{path} exists and is not a socket.')
+            if _socket_in_use(path):
+                raise CommandError(f'A moderation server is already listening on {path}.')
+            # Left behind by a previous run that did not shut down cleanly
+            path.unlink()
+
+        self.stdout.write('Loading moderation model...')
+        get_pipeline()
+        server = ModerationServer(str(path))
+        os.chmod(path, 0o660)
+        if opts['metrics_port']:
+            metrics_server = ThreadingHTTPServer(('127.0.0.1', opts['metrics_port']), MetricsHandler)
+            threading.Thread(target=metrics_server.serve_forever, daemon=True).start()
+            self.stdout.write(f'Metrics on http://127.0.0.1:{opts["metrics_port"]}/')
+        self.stdout.write(self.style.SUCCESS(f'Moderation server listening on {path}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if path.exists():
+                path.unlink()
@@ -0,0 +1,285 @@
+"""Comment moderation: one hate-speech model per host instead of per worker.
+
+`python manage.py moderation_server` loads the transformers pipeline once and
+answers requests on the Unix socket MODERATION_SOCKET. Web workers call it
+through ModerationClient, so adding workers does not add model copies.
+
+Wire format: one JSON object per line in each direction.
+
+    -> {"texts": ["...", "..."]}
+    <- {"labels": ["acceptable", "offensive"]}      or {"error": "..."}
+
+If the server cannot be reached within MODERATION_TIMEOUT seconds,
+MODERATION_FALLBACK decides what happens:
+
+  reject  raise ModerationUnavailable; the comment is refused for now (default)
+  local   load the pipeline in this process and classify here
+  allow   treat the comment as acceptable
+
+Set MODERATION_SERVER_ENABLED=0 to always classify in-process.
+
+Wherever the model runs, calls go through a MicroBatcher: texts arriving
+within MODERATION_BATCH_MAX_WAIT_MS of each other (up to
+MODERATION_BATCH_MAX_SIZE) share one padded forward pass. Batch sizes and
+queue waits are recorded in backend.metrics.
+
+Verdicts are cached by normalized text (comments/verdict_cache.py), so
+repeated comments skip all of the above.
+"""
+import json
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from django.conf import settings
+
+from backend.metrics import REGISTRY
+
+
+LABEL_MAP = {
+    'LABEL_0': 'acceptable',
+    'LABEL_1': 'inappropriate',
+    'LABEL_2': 'offensive',
+    'LABEL_3': 'violent'
+}
+
+
+BATCH_SIZE = REGISTRY.histogram(
+    'clipzy_moderation_batch_size', 'Texts per moderation forward pass.',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    'clipzy_moderation_queue_wait_seconds', 'Time a moderation request waited to join a batch.',
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+INFERENCE_SECONDS = REGISTRY.histogram(
+    'clipzy_moderation_inference_seconds', 'Wall time of one moderation forward pass.',
+)
+
+
+class ModerationUnavailable(Exception):
+    pass
+
+
+_pipe = None
+_pipe_lock = threading.Lock()
+
+
+def load_pipeline(quantize=None, threads=None):
+    """Build the hate-speech pipeline (imports torch/transformers).
+
+    quantize: dynamic int8 quantization of the Linear layers, for CPU
+    (default MODERATION_QUANTIZE). threads: torch intra-op threads for this
+    process (default MODERATION_TORCH_THREADS; 0 leaves torch's default).
+    """
+    import torch
+    from transformers import pipeline
+
+    if quantize is None:
+        quantize = getattr(settings, 'MODERATION_QUANTIZE', False)
+    if threads is None:
+        threads = getattr(settings, 'MODERATION_TORCH_THREADS', 0)
+    if threads:
+        torch.set_num_threads(int(threads))
+    model_path = str(getattr(settings, 'MODERATION_MODEL_PATH', Path(settings.BASE_DIR) / "comments" / "hate_speech"))
+    pipe = pipeline("text-classification", model=model_path, framework="pt", device=-1)
+    pipe.model.eval()
+    if quantize:
+        pipe.model = torch.ao.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipe
+
+
+def get_pipeline():
+    """The process-wide pipeline, loaded on first use."""
+    global _pipe
+    with _pipe_lock:
+        if _pipe is None:
+            _pipe = load_pipeline()
+        return _pipe
+
+
+def run_pipeline(texts, pipe=None):
+    """One padded forward pass over `texts`; returns one label per text."""
+    import torch
+
+    pipe = pipe or get_pipeline()
+    with torch.inference_mode():
+        outputs = pipe(list(texts), batch_size=len(texts), padding=True, truncation=True)
+    return [LABEL_MAP.get(o['label'], o['label']) for o in outputs]
+
+
+class MicroBatcher:
+    """Coalesces concurrent calls to `fn(texts)` into batched calls.
+
+    A single daemon thread owns `fn`: it takes the first waiting request,
+    keeps collecting requests for up to `max_wait_ms` or until `max_batch`
+    texts are queued, runs them together and hands each caller its slice.
+    """
+
+    def __init__(self, fn, max_batch=None, max_wait_ms=None):
+        self.fn = fn
+        self.max_batch = int(max_batch or getattr(settings, 'MODERATION_BATCH_MAX_SIZE', 32))
+        wait_ms = max_wait_ms if max_wait_ms is not None else getattr(settings, 'MODERATION_BATCH_MAX_WAIT_MS', 5)
+        self.max_wait = float(wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((texts, future, time.perf_counter()))
+        return future.result()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='moderation-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            texts = []
+            for item_texts, _, enqueued in batch:
+                QUEUE_WAIT_SECONDS.observe(start - enqueued)
+                texts.extend(item_texts)
+            BATCH_SIZE.observe(len(texts))
+            try:
+                labels = self.fn(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                INFERENCE_SECONDS.observe(time.perf_counter() - start)
+            offset = 0
+            for item_texts, future, _ in batch:
+                future.set_result(labels[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher(run_pipeline)
+        return _batcher
+
+
+def classify_local(texts):
+    """Classify with the model in this process; returns one label per text."""
+    return get_batcher().submit(texts)
+
+
+class ModerationClient:
+    def __init__(self, path=None, timeout=None):
+        self.path = str(path or getattr(settings, 'MODERATION_SOCKET', Path(settings.BASE_DIR) / 'moderation.sock'))
+        self.timeout = float(timeout if timeout is not None else getattr(settings, 'MODERATION_TIMEOUT', 2.0))
+
+    def classify(self, texts):
+        texts = list(texts)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                sock.sendall(json.dumps({'texts': texts}).encode() + b'\n')
+                with sock.makefile('rb') as reader:
+                    line = reader.readline()
+        except OSError as e:
+            raise ModerationUnavailable(f"moderation server unreachable at {self.path}: {e}")
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            raise ModerationUnavailable("moderation server closed the connection")
+        if 'error' in reply:
+            raise ModerationUnavailable(reply['error'])
+        labels = reply.get('labels')
+        if not isinstance(labels, list) or len(labels) != len(texts):
+            raise ModerationUnavailable("malformed reply from moderation server")
+        return labels
+
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = ModerationClient()
+    return _client
+
+
+def _classify_uncached(texts, fallback=True):
+    """(labels, cacheable): labels from the model, or from the fallback policy."""
+    if not getattr(settings, 'MODERATION_SERVER_ENABLED', True):
+        return classify_local(texts), True
+    try:
+        return get_client().classify(texts), True
+    except ModerationUnavailable as e:
+        if not fallback:
+            raise
+        fallback = getattr(settings, 'MODERATION_FALLBACK', 'reject')
+        print(f"moderation: {e}; fallback={fallback}")
+        if fallback == 'local':
+            return classify_local(texts), True
+        if fallback == 'allow':
+            # Not a verdict; must not be remembered
+            return ['acceptable'] * len(texts), False
+        raise
+
+
+def classify_texts(texts, fallback=True):
+    """One label per text: cached verdicts first, then the model (see module docstring).
+
+    fallback=False ignores MODERATION_FALLBACK and always raises
+    ModerationUnavailable when the server is down; the moderate_comments
+    worker uses it because its decisions are permanent.
+    """
+    from .verdict_cache import get_verdict_cache, text_key
+
+    texts = list(texts)
+    cache = get_verdict_cache()
+    labels = cache.get_many(texts) if cache is not None else {}
+    missing = [i for i in range(len(texts)) if i not in labels]
+    if missing:
+        # Texts that normalize the same are classified once
+        unique = {}
+        for i in missing:
+            unique.setdefault(text_key(texts[i]), texts[i])
+        fresh, cacheable = _classify_uncached(list(unique.values()), fallback=fallback)
+        by_key = dict(zip(unique, fresh))
+        for i in missing:
+            labels[i] = by_key[text_key(texts[i])]
+        if cache is not None and cacheable:
+            cache.set_many(list(unique.values()), fresh)
+    return [labels[i] for i in range(len(texts))]
+
+
+def classify_text(text):
+    return classify_texts([text])[0]
@@ -1,3 +1,74 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from features.models import Clip, Comment
+
+from .management.commands.moderate_comments import moderate_batch
+from .moderation import ModerationUnavailable
+
+
+class StubClient:
+    def __init__(self, labels=None):
+        self.labels = labels
+        self.calls = []
+
+    def classify(self, texts):
+        self.calls.append(list(texts))
+        if self.labels is None:
+            raise ModerationUnavailable('server down')
+        return [self.labels.get(text, 'acceptable') for text in texts]
+
+
+@override_settings(MODERATION_SERVER_ENABLED=True, MODERATION_CACHE_ENABLED=False, MODERATION_FALLBACK='allow')
+class ModerateBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('poster')
+        self.clip = Clip.objects.create(caption='c', clipUrl='http://example.com/c.mp4', uploader=self.user)
+
+    def comment(self, text, **kwargs):
+        return Comment.objects.create(
+            clip=self.clip, user=self.user, comment=text, status=Comment.STATUS_PENDING, **kwargs
+        )
+
+    def run_with(self, client, batch_size=10):
+        with mock.patch('comments.moderation.get_client', return_value=client):
+            return moderate_batch(batch_size)
+
+    def test_verdicts_publish_or_reject(self):
+        nice, rude = self.comment('nice clip'), self.comment('rude words')
+
+        done = self.run_with(StubClient({'rude words': 'offensive'}))
+
+        self.assertEqual(done, 2)
+        nice.refresh_from_db()
+        rude.refresh_from_db()
+        self.assertEqual((nice.status, nice.moderation_label), (Comment.STATUS_PUBLISHED, 'acceptable'))
+        self.assertEqual((rude.status, rude.moderation_label), (Comment.STATUS_REJECTED, 'offensive'))
+        self.assertIsNone(nice.moderation_claimed_at)
+
+    def test_outage_keeps_comments_pending_despite_allow_fallback(self):
+        pending = self.comment('anything')
+
+        with self.assertRaises(ModerationUnavailable):
+            self.run_with(StubClient())
+
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, Comment.STATUS_PENDING)
+        self.assertIsNone(pending.moderation_claimed_at)
+
+    def test_claimed_comments_are_skipped_until_the_claim_goes_stale(self):
+        claimed = self.comment('busy', moderation_claimed_at=timezone.now())
+        stale = self.comment('abandoned', moderation_claimed_at=timezone.now() - timedelta(hours=1))
+        client = StubClient({})
+
+        self.assertEqual(self.run_with(client), 1)
+
+        self.assertEqual(client.calls, [['abandoned']])
+        claimed.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertEqual(claimed.status, Comment.STATUS_PENDING)
+        self.assertEqual(stale.status, Comment.STATUS_PUBLISHED)
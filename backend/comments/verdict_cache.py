@@ -0,0 +1,102 @@
+"""Cache of moderation verdicts keyed by normalized comment text.
+
+Short comments ("first", "🔥🔥") and copy-pasted spam repeat constantly, so
+verdicts are remembered per text. Texts are normalized first (NFKC, case
+folded, whitespace collapsed) and stored under a hash of the result:
+
+  1. an in-process LRU with a TTL (MODERATION_CACHE_SIZE entries,
+     MODERATION_CACHE_TTL seconds)
+  2. optionally a shared Django cache (MODERATION_SHARED_CACHE alias, e.g. a
+     Redis cache) so workers and hosts learn from each other
+
+Lookups are counted in clipzy_moderation_cache_requests_total by result
+(local_hit, shared_hit, miss); hit rate = hits / all of them.
+"""
+import hashlib
+import re
+import threading
+import unicodedata
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import caches
+
+from backend.metrics import REGISTRY
+
+
+CACHE_REQUESTS = REGISTRY.counter(
+    'clipzy_moderation_cache_requests_total', 'Moderation verdict cache lookups.',
+    labelnames=('result',),
+)
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    return _whitespace.sub(' ', unicodedata.normalize('NFKC', text).casefold()).strip()
+
+
+def text_key(text):
+    digest = hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=16).hexdigest()
+    return f'moderation:v1:{digest}'
+
+
+class VerdictCache:
+    def __init__(self, maxsize=None, ttl=None, shared_alias=None):
+        self.ttl = float(ttl if ttl is not None else getattr(settings, 'MODERATION_CACHE_TTL', 3600))
+        maxsize = int(maxsize or getattr(settings, 'MODERATION_CACHE_SIZE', 10000))
+        self._local = TTLCache(maxsize=maxsize, ttl=self.ttl)
+        self._lock = threading.Lock()
+        alias = shared_alias if shared_alias is not None else getattr(settings, 'MODERATION_SHARED_CACHE', None)
+        self._shared = caches[alias] if alias else None
+
+    def get_many(self, texts):
+        """{index: label} for every text with a cached verdict."""
+        keys = [text_key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                label = self._local.get(key)
+                if label is not None:
+                    found[i] = label
+        CACHE_REQUESTS.inc('local_hit', amount=len(found))
+
+        missing = [i for i in range(len(texts)) if i not in found]
+        if self._shared is not None and missing:
+            try:
+                shared = self._shared.get_many([keys[i] for i in missing])
+            except Exception as e:
+                print(f"moderation cache: shared lookup failed: {e}")
+                shared = {}
+            with self._lock:
+                for i in missing:
+                    if keys[i] in shared:
+                        found[i] = self._local[keys[i]] = shared[keys[i]]
+            CACHE_REQUESTS.inc('shared_hit', amount=sum(1 for i in missing if i in found))
+        CACHE_REQUESTS.inc('miss', amount=len(texts) - len(found))
+        return found
+
+    def set_many(self, texts, labels):
+        entries = {text_key(t): label for t, label in zip(texts, labels)}
+        with self._lock:
+            self._local.update(entries)
+        if self._shared is not None:
+            try:
+                self._shared.set_many(entries, timeout=self.ttl)
+            except Exception as e:
+                print(f"moderation cache: shared store failed: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_verdict_cache():
+    """The process-wide cache, or None when MODERATION_CACHE_ENABLED is off."""
+    global _cache
+    if not getattr(settings, 'MODERATION_CACHE_ENABLED', True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = VerdictCache()
+        return _cache
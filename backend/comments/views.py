@@ -1,33 +1,19 @@
 from django.shortcuts import render
+from django.db import IntegrityError, transaction
 from django.http import JsonResponse
-from transformers import pipeline
-from django.conf import settings
-from pathlib import Path
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from features.models import Clip, Comment
 
 
-
-model_path = str(Path(settings.BASE_DIR) / "comments" / "hate_speech")
-pipe = pipeline("text-classification", model=model_path, framework="pt")
-
-def classify_text(text):
-
-    if not text:
-        return JsonResponse({"error": "No text provided"}, status=400)
-
-    # Get prediction
-    output = pipe(text)[0]
-    label_map = {
-        'LABEL_0': 'acceptable',
-        'LABEL_1': 'inappropriate',
-        'LABEL_2': 'offensive',
-        'LABEL_3': 'violent'
+def comment_data(comment, username):
+    return {
+        'id': comment.id,
+        'user': username,
+        'comment': comment.comment,
+        'created_at': comment.created_at,
+        'status': comment.status,
     }
-    predicted_label = label_map.get(output['label'], output['label'])
-
-    return predicted_label
 
 
 @api_view(['GET'])
@@ -40,16 +26,13 @@ def getComments(request):
         video = Clip.objects.get(id=videoId)
     except Clip.DoesNotExist:
         return JsonResponse({'error': 'Video not found'}, status=404)
-    comments = Comment.objects.filter(clip=video).order_by('-created_at')
-    comments_data = [
-        {
-            'id': comment.id,
-            'user': comment.user.username,
-            'comment': comment.comment,
-            'created_at': comment.created_at
-        }
-        for comment in comments
-    ]
+    comments = (
+        Comment.objects.visible_to(request.user)
+        .filter(clip=video)
+        .select_related('user')
+        .order_by('-created_at')
+    )
+    comments_data = [comment_data(comment, comment.user.username) for comment in comments]
     return JsonResponse({'comments': comments_data}, status=200)
 
 
@@ -63,23 +46,16 @@ def addComment(request):
     if not post_id or not content:
         return JsonResponse({'error': 'video_id and content are required'}, status=400)
 
-    # Classify the comment
-    prediction_response = classify_text(content)
-
-    if prediction_response == 'acceptable':
-        try:
-            clip = Clip.objects.get(id=post_id)
-            comment = Comment.objects.create(clip=clip, user=user, comment=content)
-            return JsonResponse({
-                'message': 'Comment added successfully',
-                'comment': {
-                    'id': comment.id,
-                    'user': user.username,
-                    'comment': comment.comment,
-                    'created_at': comment.created_at
-                }
-            }, status=201)
-        except Clip.DoesNotExist:
-            return JsonResponse({'error': 'Clip not found'}, status=404)
-    else:
-        return JsonResponse({'error': f'Comment not added due to classification: {prediction_response}'}, status=400)
\ No newline at end of file
+    # Stored as pending straight away; `manage.py moderate_comments` publishes or rejects it.
+    # Only the author sees it until then.
+    try:
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                clip_id=int(post_id), user=user, comment=content, status=Comment.STATUS_PENDING,
+            )
+    except (IntegrityError, TypeError, ValueError):
+        return JsonResponse({'error': 'Clip not found'}, status=404)
+    return JsonResponse({
+        'message': 'Comment submitted for review',
+        'comment': comment_data(comment, user.username),
+    }, status=201)
@@ -0,0 +1,210 @@
+"""Frame classifier backends.
+
+A backend turns a list of BGR frames into one raw label string (a JSON list
+of category names) per frame; `classify_frames` / `aggregate_labels` in
+video_classification do the rest. The active backend is picked with
+CLIP_CLASSIFIER_BACKEND (dotted path) and constructed with
+CLIP_CLASSIFIER_OPTIONS:
+
+  GeminiBackend            remote Gemini model (needs API_KEY)
+  LocalHeuristicBackend    offline, deterministic colour/texture rules on CPU
+  RecordedResponseBackend  replays recorded responses, for throughput tests
+"""
+import hashlib
+import json
+import threading
+import time
+from itertools import cycle
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+CATEGORIES_HINT = "[Sports, Animals, Food, Cooking, Technology, Nature, People, Car, Funny, Racing, Romance, Music, Travel, Adventure, Relaxing, Dance, Fashion, Motivation]"
+FRAME_PROMPT = f"Classify this frame into high-level categories like {CATEGORIES_HINT}. Respond ONLY with a JSON list of labels. No extra text, no markdown."
+BATCH_PROMPT = f"Classify each of the following {{count}} frames into high-level categories like {CATEGORIES_HINT}. Respond ONLY with a JSON list containing one JSON list of labels per frame, in the same order as the frames. No extra text, no markdown."
+
+
+def clean_response(text):
+    return text.strip().replace("```json", "").replace("```", "").strip()
+
+
+class ClassifierBackend:
+    def classify(self, frames):
+        """Return one raw label string per frame. May raise; callers retry."""
+        raise NotImplementedError
+
+
+class GeminiBackend(ClassifierBackend):
+    """Gemini vision model. The SDK is imported and configured on first use."""
+
+    def __init__(self, model_name=None, api_key=None):
+        self.model_name = model_name or getattr(settings, 'GEMINI_MODEL', 'gemini-2.0-flash-lite')
+        self.api_key = api_key or getattr(settings, 'GEMINI_API_KEY', None)
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                if not self.api_key:
+                    raise ImproperlyConfigured("API_KEY not found in .env file")
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    def classify(self, frames):
+        from .video_classification import frame_encoder
+
+        parts = [FRAME_PROMPT if len(frames) == 1 else BATCH_PROMPT.format(count=len(frames))]
+        parts.extend(frame_encoder.payload(f) for f in frames)
+        response = self.model.generate_content(parts)
+        text = response.text.strip() if getattr(response, 'text', None) else "[]"
+        if len(frames) == 1:
+            return [text]
+        try:
+            per_frame = json.loads(clean_response(text))
+            if isinstance(per_frame, list) and len(per_frame) == len(frames) and all(isinstance(x, list) for x in per_frame):
+                return [json.dumps(x) for x in per_frame]
+        except ValueError:
+            pass
+        # Could not split the answer per frame; keep every label on the first frame
+        # so aggregate_labels still counts them.
+        return [text] + ["[]"] * (len(frames) - 1)
+
+
+class LocalHeuristicBackend(ClassifierBackend):
+    """Cheap offline classifier from colour and texture statistics.
+
+    Works on a 128px thumbnail in HSV: dominant hue families, saturation,
+    brightness and edge density map onto the same category names the remote
+    model uses. It is deterministic, so it also gives stable labels in tests.
+    """
+
+    def __init__(self, thumbnail_edge=128):
+        self.thumbnail_edge = thumbnail_edge
+
+    def _features(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.thumbnail_edge / max(height, width)
+        if scale < 1:
+            frame = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        hue, sat, val = hsv[..., 0], hsv[..., 1] / 255.0, hsv[..., 2] / 255.0
+        colourful = sat > 0.25
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(gray, 80, 160)
+        top = hsv[: max(1, hsv.shape[0] // 3)]
+
+        def share(mask):
+            return float(np.mean(mask & colourful))
+
+        return {
+            'green': share((hue >= 35) & (hue <= 85)),
+            'blue': share((hue >= 90) & (hue <= 130)),
+            'warm': share((hue <= 25) | (hue >= 160)),
+            # skin tones: orange-ish hue, moderate saturation, not too dark
+            'skin': float(np.mean((hue >= 5) & (hue <= 20) & (sat > 0.2) & (sat < 0.6) & (val > 0.35))),
+            'sky': float(np.mean((top[..., 0] >= 90) & (top[..., 0] <= 130) & (top[..., 1] > 50))),
+            'saturation': float(sat.mean()),
+            'brightness': float(val.mean()),
+            'edges': float(np.mean(edges > 0)),
+        }
+
+    def labels_for(self, frame):
+        f = self._features(frame)
+        labels = []
+        if f['green'] > 0.3:
+            labels.append('Nature')
+        if f['sky'] > 0.4:
+            labels.extend(['Travel', 'Adventure'] if f['edges'] > 0.08 else ['Travel'])
+        if f['skin'] > 0.15:
+            labels.append('People')
+        if f['warm'] > 0.35 and f['saturation'] > 0.4:
+            labels.append('Food')
+        if f['edges'] > 0.18 and f['saturation'] > 0.35:
+            labels.append('Sports')
+        if f['brightness'] < 0.3:
+            labels.append('Music' if f['saturation'] > 0.35 else 'Relaxing')
+        if f['saturation'] < 0.12 and f['edges'] > 0.1:
+            labels.append('Technology')
+        if not labels:
+            labels.append('Relaxing' if f['edges'] < 0.05 else 'People')
+        return list(dict.fromkeys(labels))
+
+    def classify(self, frames):
+        return [json.dumps(self.labels_for(frame)) for frame in frames]
+
+
+class RecordedResponseBackend(ClassifierBackend):
+    """Replays recorded label strings in order, with optional simulated latency.
+
+    `responses` is a list of raw label strings (or label lists); `path` points
+    to a JSON file holding such a list. Latency is paid once per request, like
+    a network round trip, so batching and concurrency show up in benchmarks.
+    """
+
+    def __init__(self, responses=None, path=None, latency_ms=0):
+        if responses is None and path:
+            with open(path) as fh:
+                responses = json.load(fh)
+        responses = responses or ['["People"]']
+        self._responses = cycle([r if isinstance(r, str) else json.dumps(r) for r in responses])
+        self._lock = threading.Lock()
+        self.latency = latency_ms / 1000.0
+        self.requests = 0
+
+    def classify(self, frames):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            return [next(self._responses) for _ in frames]
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier():
+    """The process-wide backend configured by CLIP_CLASSIFIER_BACKEND."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            path = getattr(settings, 'CLIP_CLASSIFIER_BACKEND', 'features.classifiers.GeminiBackend')
+            options = getattr(settings, 'CLIP_CLASSIFIER_OPTIONS', {}) or {}
+            _classifier = import_string(path)(**options)
+        return _classifier
+
+
+def classifier_version():
+    """Short fingerprint of what produces labels right now.
+
+    Covers the active backend class, CLIP_CLASSIFIER_OPTIONS, GEMINI_MODEL, the
+    prompts (and so the category list) and LABEL_CACHE_VERSION, which can be
+    bumped by hand for changes none of these capture. The label cache keys its
+    entries by it, so switching any of them stops old labels being served.
+    """
+    classifier = get_classifier()
+    parts = [
+        f'{type(classifier).__module__}.{type(classifier).__qualname__}',
+        json.dumps(getattr(settings, 'CLIP_CLASSIFIER_OPTIONS', {}) or {}, sort_keys=True, default=str),
+        getattr(classifier, 'model_name', ''),
+        FRAME_PROMPT,
+        BATCH_PROMPT,
+        str(getattr(settings, 'LABEL_CACHE_VERSION', '1')),
+    ]
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def set_classifier(classifier):
+    """Swap the process-wide backend (benchmarks, tests); returns the previous one."""
+    global _classifier
+    with _classifier_lock:
+        previous, _classifier = _classifier, classifier
+    return previous
@@ -0,0 +1,52 @@
+import json
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from .models import ClassificationJob, Clip
+from .signals import clip_group_name
+
+
+class ClipJobConsumer(AsyncWebsocketConsumer):
+    """Pushes a `tags_ready` event when a clip's classification job finishes.
+
+    Connect to ws/clips/<clip_id>/?token=<JWT access token>; like
+    getClipJobStatus, only the clip's uploader is admitted.
+    """
+
+    async def connect(self):
+        self.clip_id = int(self.scope["url_route"]["kwargs"]["clip_id"])
+        self.group_name = clip_group_name(self.clip_id)
+        self.user = self.scope.get("user")
+
+        if not getattr(self.user, "is_authenticated", False) or not await self.is_uploader():
+            await self.close(code=4403)
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        # The job may already be finished by the time the client subscribes
+        job = await self.get_job()
+        if job is not None:
+            await self.send(text_data=json.dumps({"type": "status", **job}))
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    @database_sync_to_async
+    def is_uploader(self):
+        return Clip.objects.filter(id=self.clip_id, uploader=self.user).exists()
+
+    @database_sync_to_async
+    def get_job(self):
+        job = ClassificationJob.objects.filter(clip_id=self.clip_id).values('status', 'labels').first()
+        if job is None:
+            return None
+        return {"clip_id": self.clip_id, "status": job['status'], "labels": job['labels']}
+
+    async def tags_ready(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "tags_ready",
+            "clip_id": event["clip_id"],
+            "status": event["status"],
+            "labels": event["labels"],
+        }))
@@ -0,0 +1,130 @@
+"""Background classification of uploaded clips.
+
+postClip creates the Clip straight away and hands the saved upload to a
+small in-process thread pool. The worker classifies the video, renders the
+poster/sprite/preview from the same keyframes, tags the clip, records the
+outcome on its ClassificationJob and sends `tags_ready`.
+"""
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import ClassificationJob, Clip, TaggedVideo, VideoCategory
+from .signals import tags_ready
+from .uploads import remove_quietly
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(getattr(settings, 'CLIP_JOB_WORKERS', 2)),
+                thread_name_prefix='clip-job',
+            )
+        return _executor
+
+
+def apply_labels(clip, labels):
+    """Tag `clip` with every label in `labels` ((label, count) pairs)."""
+    names = [label for label, _ in labels if label]
+    if not names:
+        return
+    VideoCategory.objects.bulk_create([VideoCategory(name=n) for n in names], ignore_conflicts=True)
+    categories = VideoCategory.objects.filter(name__in=names)
+    TaggedVideo.objects.bulk_create([TaggedVideo(clip=clip, category=c) for c in categories])
+
+
+def replace_labels(labels_by_clip):
+    """Swap the tags of many clips at once ({clip_id: [(label, count), ...]})."""
+    names = {label for labels in labels_by_clip.values() for label, _ in labels if label}
+    VideoCategory.objects.bulk_create([VideoCategory(name=n) for n in names], ignore_conflicts=True)
+    categories = dict(VideoCategory.objects.filter(name__in=names).values_list('name', 'id'))
+    TaggedVideo.objects.filter(clip_id__in=list(labels_by_clip)).delete()
+    TaggedVideo.objects.bulk_create([
+        TaggedVideo(clip_id=clip_id, category_id=categories[label])
+        for clip_id, labels in labels_by_clip.items()
+        for label in dict.fromkeys(label for label, _ in labels if label)
+    ])
+
+
+def enqueue_classification(job, video_path, digest=None):
+    """Schedule classification once the surrounding transaction has committed.
+
+    The worker owns `video_path` from here on and always deletes it.
+    """
+    transaction.on_commit(lambda: get_executor().submit(run_classification, job.id, video_path, digest))
+
+
+def run_classification(job_id, video_path, digest=None):
+    from .renditions import render_clip_media
+    from .video_classification import classify_video
+
+    close_old_connections()
+    job = None
+    try:
+        job = ClassificationJob.objects.select_related('clip').get(id=job_id)
+        job.status = ClassificationJob.STATUS_RUNNING
+        job.save(update_fields=['status', 'updated_at'])
+
+        keyframes = []
+        labels = classify_video(video_path, digest=digest, frames_out=keyframes)
+        try:
+            media = render_clip_media(job.clip_id, video_path, keyframes)
+        except Exception as e:
+            # Renditions are nice to have; the clip still gets its tags
+            print(f"run_classification: renditions failed for clip {job.clip_id}: {e}")
+            media = {}
+        with transaction.atomic():
+            apply_labels(job.clip, labels)
+            if media:
+                Clip.objects.filter(id=job.clip_id).update(**media)
+            job.labels = labels
+            job.status = ClassificationJob.STATUS_DONE
+            job.save(update_fields=['labels', 'status', 'updated_at'])
+    except Exception as e:
+        print(f"run_classification: job {job_id} failed: {e}")
+        traceback.print_exc()
+        if job is not None:
+            job.status = ClassificationJob.STATUS_FAILED
+            job.error = str(e)
+            job.save(update_fields=['status', 'error', 'updated_at'])
+    finally:
+        remove_quietly(video_path)
+        if job is not None:
+            tags_ready.send(sender=ClassificationJob, clip_id=job.clip_id, status=job.status, labels=job.labels)
+        close_old_connections()
+
+
+def warm_label_cache(video_path):
+    """Classify keyframes of a partially received upload into the frame cache.
+
+    Runs while a resumable upload is still in progress; when the full file is
+    classified on commit, frames close to these are answered from the cache.
+    Containers that cannot be decoded from a prefix (e.g. MP4 with the index
+    at the end) simply yield no frames.
+    """
+    from .label_cache import frame_phash, get_label_cache
+    from .video_classification import classify_frames, video_keyframes
+
+    cache = get_label_cache()
+    if cache is None:
+        return
+    try:
+        frames = video_keyframes(video_path)
+        misses = [(frame_phash(f), f) for f in frames]
+        misses = [(h, f) for h, f in misses if cache.get_frame(h) is None]
+        labels = classify_frames([f for _, f in misses])
+        for (phash, _), lbl in zip(misses, labels):
+            if lbl and lbl != "[]":
+                cache.put_frame(phash, lbl)
+        print(f"warm_label_cache: classified {len(misses)} prefix frames of {video_path}")
+    except Exception as e:
+        print(f"warm_label_cache: skipped {video_path}: {e}")
@@ -0,0 +1,165 @@
+"""Persistent cache of classification results.
+
+Two tables in one SQLite file (LABEL_CACHE_PATH), shared by every worker:
+
+  videos  sha256 of the uploaded file -> aggregated labels
+  frames  64-bit dHash of a sampled frame -> raw label text for that frame
+
+An exact re-upload hits `videos` and skips decoding entirely. For new files,
+each sampled frame is looked up in `frames` by Hamming distance, so
+near-identical frames (re-encodes, crops of the same shot) reuse earlier
+labels and only the misses are sent to the classifier. Both tables are LRU
+bounded by `last_used`.
+
+Every entry also carries the classifier version (classifiers.classifier_version:
+backend, model, prompts, LABEL_CACHE_VERSION) and lookups only match the
+current one, so labels from a previous backend or prompt are never served.
+Files written before versioning are dropped on open.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def frame_phash(frame):
+    """64-bit difference hash of a BGR frame, as a signed int (SQLite INTEGER)."""
+    import cv2
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = int(np.packbits(bits).view('>u8')[0])
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _hamming(hashes, target):
+    xor = np.bitwise_xor(hashes.astype(np.int64).view(np.uint64), np.uint64(target & 0xFFFFFFFFFFFFFFFF))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class LabelCache:
+    def __init__(self, path=None, max_videos=None, max_frames=None, max_distance=None, version=None):
+        self._version = version
+        self.path = Path(path or getattr(settings, 'LABEL_CACHE_PATH', Path(settings.BASE_DIR) / 'label_cache.sqlite3'))
+        self.max_videos = max_videos or int(getattr(settings, 'LABEL_CACHE_MAX_VIDEOS', 50000))
+        self.max_frames = max_frames or int(getattr(settings, 'LABEL_CACHE_MAX_FRAMES', 20000))
+        self.max_distance = int(getattr(settings, 'LABEL_CACHE_MAX_DISTANCE', 6) if max_distance is None else max_distance)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialised = False
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        with self._init_lock:
+            if not self._initialised:
+                columns = [row[1] for row in conn.execute('PRAGMA table_info(videos)')]
+                if columns and 'version' not in columns:
+                    # Unversioned entries from an older release: nothing says what produced them
+                    conn.execute('DROP TABLE videos')
+                    conn.execute('DROP TABLE IF EXISTS frames')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS videos (version TEXT NOT NULL, digest TEXT NOT NULL, '
+                    'labels TEXT NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (version, digest))'
+                )
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS frames (version TEXT NOT NULL, phash INTEGER NOT NULL, '
+                    'labels TEXT NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (version, phash))'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS videos_last_used ON videos (last_used)')
+                conn.execute('CREATE INDEX IF NOT EXISTS frames_last_used ON frames (last_used)')
+                self._initialised = True
+        return conn
+
+    @property
+    def version(self):
+        if self._version is not None:
+            return self._version
+        from .classifiers import classifier_version
+
+        return classifier_version()
+
+    def _evict(self, conn, table, limit):
+        (count,) = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()
+        if count > limit:
+            conn.execute(
+                f'DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY last_used ASC LIMIT ?)',
+                (count - limit,),
+            )
+
+    def get_video(self, digest):
+        conn = self._conn()
+        version = self.version
+        row = conn.execute('SELECT labels FROM videos WHERE version = ? AND digest = ?', (version, digest)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE videos SET last_used = ? WHERE version = ? AND digest = ?', (time.time(), version, digest))
+        return [tuple(item) for item in json.loads(row[0])]
+
+    def put_video(self, digest, labels):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO videos (version, digest, labels, last_used) VALUES (?, ?, ?, ?)',
+            (self.version, digest, json.dumps(labels), time.time()),
+        )
+        self._evict(conn, 'videos', self.max_videos)
+
+    def get_frame(self, phash):
+        """Labels of the closest cached frame within max_distance bits, or None."""
+        conn = self._conn()
+        version = self.version
+        lookup = 'SELECT phash, labels FROM frames WHERE version = ? AND phash = ?'
+        row = conn.execute(lookup, (version, phash)).fetchone()
+        if row is None and self.max_distance > 0:
+            rows = conn.execute('SELECT phash FROM frames WHERE version = ?', (version,)).fetchall()
+            if rows:
+                hashes = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+                distances = _hamming(hashes, phash)
+                best = int(distances.argmin())
+                if distances[best] <= self.max_distance:
+                    row = conn.execute(lookup, (version, int(hashes[best]))).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE frames SET last_used = ? WHERE version = ? AND phash = ?', (time.time(), version, row[0]))
+        return row[1]
+
+    def put_frame(self, phash, labels):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO frames (version, phash, labels, last_used) VALUES (?, ?, ?, ?)',
+            (self.version, phash, labels, time.time()),
+        )
+        self._evict(conn, 'frames', self.max_frames)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_label_cache():
+    """Process-wide LabelCache, or None when LABEL_CACHE_ENABLED is off."""
+    global _cache
+    if not getattr(settings, 'LABEL_CACHE_ENABLED', True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LabelCache()
+        return _cache
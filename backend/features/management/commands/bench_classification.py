@@ -0,0 +1,63 @@
+"""Measure upload-classification throughput without touching the network.
+
+    python manage.py bench_classification video.mp4 --recorded --latency-ms 400
+    python manage.py bench_classification video.mp4 --backend features.classifiers.LocalHeuristicBackend
+
+Runs classify_video on the given files --repeat times with the label cache
+disabled and prints videos/second and per-video latency as JSON. --recorded
+swaps in RecordedResponseBackend so remote-model round trips can be simulated.
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from features import classifiers
+from features.video_classification import classify_video
+
+
+class Command(BaseCommand):
+    help = 'Benchmark classify_video throughput with a chosen classifier backend.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('videos', nargs='+')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--frames', type=int, default=5)
+        parser.add_argument('--backend', help='Dotted path of a classifier backend to use instead of the configured one.')
+        parser.add_argument('--recorded', action='store_true', help='Use RecordedResponseBackend.')
+        parser.add_argument('--responses', help='JSON file of recorded responses for --recorded.')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Simulated per-request latency for --recorded.')
+
+    def handle(self, *args, **opts):
+        if opts['recorded']:
+            backend = classifiers.RecordedResponseBackend(path=opts['responses'], latency_ms=opts['latency_ms'])
+        elif opts['backend']:
+            backend = import_string(opts['backend'])()
+        else:
+            backend = classifiers.get_classifier()
+        previous = classifiers.set_classifier(backend)
+
+        timings = []
+        try:
+            start = time.perf_counter()
+            for _ in range(max(1, opts['repeat'])):
+                for video in opts['videos']:
+                    t0 = time.perf_counter()
+                    classify_video(video, num_frames=opts['frames'], cache=False)
+                    timings.append((time.perf_counter() - t0) * 1000)
+            elapsed = time.perf_counter() - start
+        except OSError as e:
+            raise CommandError(str(e))
+        finally:
+            classifiers.set_classifier(previous)
+
+        timings.sort()
+        self.stdout.write(json.dumps({
+            'backend': f'{type(backend).__module__}.{type(backend).__name__}',
+            'videos': len(timings),
+            'videos_per_second': round(len(timings) / elapsed, 3),
+            'p50_ms': round(timings[len(timings) // 2], 3),
+            'max_ms': round(timings[-1], 3),
+            'requests': getattr(backend, 'requests', None),
+        }, indent=2))
@@ -0,0 +1,150 @@
+"""Drive every API endpoint through the test client and report latency/query stats.
+
+    python manage.py seed_synthetic_data --users 500
+    python manage.py bench_endpoints --iterations 50 --output bench.json
+
+The report is JSON (one entry per endpoint with p50/p90/p99/max latency in ms
+and the median query count) so runs from different commits can be diffed.
+Run it against a database seeded by seed_synthetic_data, never production:
+write endpoints (likes, follows, comments, messages, clips) are exercised too
+unless --skip-writes is given.
+"""
+import json
+import math
+import subprocess
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from chat.models import ChatRoom
+from features.models import Clip
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API endpoints (latency percentiles and query counts) and print JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--prefix', default='synth_', help='Username prefix of seeded users.')
+        parser.add_argument('--only', nargs='*', help='Only run endpoints with these names.')
+        parser.add_argument('--skip-writes', action='store_true')
+        parser.add_argument('--output', help='Write the JSON report to this file as well.')
+
+    def handle(self, *args, **opts):
+        if opts['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+        users = list(User.objects.filter(username__startswith=opts['prefix']).order_by('id')[:2])
+        if len(users) < 2:
+            raise CommandError('Need at least two seeded users; run seed_synthetic_data first.')
+        user, other = users
+        clip = Clip.objects.order_by('-likeCount').first()
+        room = ChatRoom.objects.filter(participants=user).first()
+        if clip is None or room is None:
+            raise CommandError('Need seeded clips and chat rooms; run seed_synthetic_data first.')
+
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+
+        endpoints = self._endpoints(user, other, clip, room)
+        if opts['skip_writes']:
+            endpoints = [e for e in endpoints if e[4]]
+        if opts['only']:
+            endpoints = [e for e in endpoints if e[0] in opts['only']]
+
+        results = {}
+        for name, method, path, data, read_only in endpoints:
+            results[name] = self._run(client, method, path, data, opts['warmup'], opts['iterations'])
+            self.stderr.write(f"{name:24s} p50={results[name]['p50_ms']}ms queries={results[name]['queries_median']}")
+
+        report = {
+            'revision': _git_revision(),
+            'iterations': opts['iterations'],
+            'endpoints': results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if opts['output']:
+            with open(opts['output'], 'w') as fh:
+                fh.write(output)
+        self.stdout.write(output)
+
+    def _endpoints(self, user, other, clip, room):
+        # (name, method, path, data, read_only)
+        return [
+            ('searchUsers', 'get', '/features/search/', {'q': user.username[:4]}, True),
+            ('isFollowing', 'get', '/features/isFollowing/', {'user2Id': other.id}, True),
+            ('fetchClips', 'get', '/features/fetchClips/', {}, True),
+            ('fetchClipsNewCreators', 'get', '/features/fetchClips/', {'type': 'newCreators'}, True),
+            ('getClip', 'get', '/features/getClip/', {'id': clip.id}, True),
+            ('getMyClips', 'get', '/features/myClips/', {}, True),
+            ('getLikedVideos', 'get', '/features/getLikedVideos/', {}, True),
+            ('getLikes', 'get', '/features/getLikes/', {'videoId': clip.id}, True),
+            ('featuresGetComments', 'get', '/features/getComments/', {'videoId': clip.id}, True),
+            ('likeVideo', 'post', '/features/addLikes/', {'video_id': clip.id}, False),
+            ('unlikeVideo', 'post', '/features/unlikeVideo/', {'video_id': clip.id}, False),
+            ('followUser', 'post', '/features/followUser/', {'following_id': other.id}, False),
+            ('unfollowUser', 'post', '/features/unfollowUser/', {'following_id': other.id}, False),
+            ('featuresAddComment', 'post', '/features/addComment/', {'video_id': clip.id, 'content': 'bench'}, False),
+            ('postClip', 'post', '/features/postClip/', {'video_url': 'https://example.com/bench.mp4', 'description': 'bench'}, False),
+            ('getNextClip', 'post', '/posts/next_clip/', {'count': 5}, True),
+            ('sendVideoMetrics', 'post', '/posts/sendVideoMetrics/', {'metrics': [
+                {'videoId': clip.id, 'categories': ['Music'], 'watchPercentage': 80, 'liked': True, 'commented': False},
+            ]}, False),
+            ('getChats', 'get', '/chat/getChats/', {}, True),
+            ('getMessages', 'get', f'/chat/getMessages/{room.id}/', {}, True),
+            ('sendMessage', 'post', '/chat/sendMessage/', {'room_id': room.id, 'content': 'bench'}, False),
+            ('getUserId', 'post', '/chat/getUserId/', {}, True),
+            ('getProfileInfo', 'get', '/accounts/profile/', {}, True),
+            ('getOtherProfile', 'get', '/accounts/getOtherProfile/', {'user_id': other.id}, True),
+            ('commentsGetComments', 'get', '/comments/getComments/', {'videoId': clip.id}, True),
+            ('commentsAddComment', 'post', '/comments/addComment/', {'video_id': clip.id, 'content': 'bench'}, False),
+        ]
+
+    def _request(self, client, method, path, data):
+        if method == 'get':
+            return client.get(path, data)
+        return client.post(path, data, format='multipart' if path.endswith('postClip/') else 'json')
+
+    def _run(self, client, method, path, data, warmup, iterations):
+        statuses = set()
+        for _ in range(warmup):
+            statuses.add(self._request(client, method, path, data).status_code)
+        timings, queries = [], []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = self._request(client, method, path, data)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(ctx.captured_queries))
+            statuses.add(response.status_code)
+        return {
+            'path': path,
+            'method': method.upper(),
+            'statuses': sorted(statuses),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p90_ms': round(percentile(timings, 90), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'max_ms': round(max(timings), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries_median': percentile(queries, 50),
+            'queries_max': max(queries),
+        }
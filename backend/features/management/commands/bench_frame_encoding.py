@@ -0,0 +1,76 @@
+"""Compare the legacy encode_image path with FrameEncoder.
+
+    python manage.py bench_frame_encoding --video clip.mp4 --frames 20
+    python manage.py bench_frame_encoding --width 1920 --height 1080
+
+Reports payload bytes and encode time per frame for both encoders and the
+savings, as JSON.
+"""
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from features.video_classification import FrameEncoder, encode_image, sample_frames
+
+
+def _synthetic_frames(count, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    for i in range(count):
+        # smooth gradients plus noise: compresses roughly like camera footage
+        base = np.stack([(xx + i * 7) % 256, (yy + i * 3) % 256, ((xx + yy) // 2) % 256], axis=-1)
+        noise = rng.integers(0, 24, size=(height, width, 3))
+        yield np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark classification frame encoding: bytes and milliseconds per frame.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--video', help='Sample frames from this video instead of synthetic frames.')
+        parser.add_argument('--frames', type=int, default=10)
+        parser.add_argument('--width', type=int, default=1920)
+        parser.add_argument('--height', type=int, default=1080)
+        parser.add_argument('--max-edge', type=int, default=None)
+        parser.add_argument('--quality', type=int, default=None)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **opts):
+        if opts['video']:
+            frames = list(sample_frames(opts['video'], num_frames=opts['frames']))
+        else:
+            frames = list(_synthetic_frames(opts['frames'], opts['width'], opts['height']))
+        if not frames:
+            raise CommandError('No frames to encode.')
+
+        encoder = FrameEncoder(max_edge=opts['max_edge'], quality=opts['quality'])
+        legacy = self._measure(lambda f: encode_image(f).encode('ascii'), frames, opts['repeat'])
+        current = self._measure(encoder.encode, frames, opts['repeat'])
+
+        report = {
+            'frames': len(frames),
+            'frame_shape': list(frames[0].shape),
+            'max_edge': encoder.max_edge,
+            'quality': encoder.quality,
+            'legacy': legacy,
+            'frame_encoder': current,
+            'saved_bytes_per_frame': round(legacy['bytes_per_frame'] - current['bytes_per_frame'], 1),
+            'saved_ms_per_frame': round(legacy['ms_per_frame'] - current['ms_per_frame'], 3),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _measure(self, encode, frames, repeat):
+        total_bytes = sum(len(encode(f)) for f in frames)
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            for frame in frames:
+                encode(frame)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return {
+            'bytes_per_frame': round(total_bytes / len(frames), 1),
+            'ms_per_frame': round(best * 1000 / len(frames), 3),
+        }
@@ -0,0 +1,21 @@
+"""Abort resumable uploads that were abandoned.
+
+    python manage.py expire_upload_sessions
+
+Open UploadSessions not touched for CLIP_UPLOAD_SESSION_TTL seconds are
+marked aborted and their partial files deleted. Expired sessions are also
+swept for a user whenever they start a new one; run this from cron to
+reclaim disk from users who never come back.
+"""
+from django.core.management.base import BaseCommand
+
+from features.models import UploadSession
+from features.uploads import expire_sessions
+
+
+class Command(BaseCommand):
+    help = 'Abort upload sessions idle for longer than CLIP_UPLOAD_SESSION_TTL and delete their files.'
+
+    def handle(self, *args, **opts):
+        expired = expire_sessions(UploadSession.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} upload sessions.'))
@@ -0,0 +1,90 @@
+"""Report where worker startup time goes.
+
+    python manage.py profile_startup --top 25
+    python manage.py profile_startup --warmup
+
+Starts a fresh interpreter with `python -X importtime`, runs django.setup()
+and loads the full URLconf (what every web worker does before its first
+request), then prints as JSON: wall time, peak RSS, and the slowest modules
+and top-level packages by import time. --warmup also runs backend.warmup.warm_up
+to show what loading everything eagerly would cost.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+CHILD = '''
+import os, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+if {warmup!r}:
+    from backend.warmup import warm_up
+    warm_up()
+print('STARTUP_SECONDS', time.perf_counter() - start)
+'''
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us)] from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Measure import time per module for a fresh worker (django.setup + URLconf).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--warmup', action='store_true', help='Also run the configured warm-up targets.')
+
+    def handle(self, *args, **opts):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings'))
+        before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD.format(warmup=opts['warmup'])],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(proc.stderr[-2000:])
+        peak_rss_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+        seconds = next((float(line.split()[1]) for line in proc.stdout.splitlines()
+                        if line.startswith('STARTUP_SECONDS')), None)
+        rows = parse_importtime(proc.stderr)
+        packages = defaultdict(int)
+        for name, self_us, _ in rows:
+            packages[name.split('.')[0]] += self_us
+        slowest = sorted(rows, key=lambda r: r[2], reverse=True)[:opts['top']]
+
+        self.stdout.write(json.dumps({
+            'startup_seconds': round(seconds, 3) if seconds is not None else None,
+            # ru_maxrss covers the largest child so far; it only grows
+            'peak_rss_mb': round(max(peak_rss_kb, before) / 1024, 1),
+            'modules_imported': len(rows),
+            'packages_ms': {
+                name: round(us / 1000, 1)
+                for name, us in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:opts['top']]
+            },
+            'slowest_modules_ms': [
+                {'module': name, 'self': round(self_us / 1000, 1), 'cumulative': round(cum_us / 1000, 1)}
+                for name, self_us, cum_us in slowest
+            ],
+        }, indent=2))
@@ -0,0 +1,200 @@
+"""Re-run classification over existing clips and rebuild their tags.
+
+    python manage.py reclassify_clips --workers 8 --rate 4
+    python manage.py reclassify_clips --untagged-only --limit 1000
+    python manage.py reclassify_clips --retry-failed
+
+Clips are walked in id order. Each worker process (spawned, see
+features.reclassify) downloads one clip, runs classify_video on it and hands
+the labels back; the parent replaces the TaggedVideo rows of finished clips
+in bulk every --batch-size results. At most --max-in-flight clips are queued
+at once and --rate caps how many start per second, so the backfill does not
+swamp the classifier backend.
+
+The label cache is bypassed for lookups (otherwise identical files would get
+their old labels back) but refreshed with the new results; --use-cache
+reuses cached labels instead.
+
+Progress is saved to --checkpoint after every batch: the highest clip id below
+which everything has been handled, plus the ids that failed. Running the
+command again resumes from there (--restart starts over).
+"""
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from features.jobs import replace_labels
+from features.models import Clip
+from features.reclassify import classify_clip, init_worker
+from features.uploads import remove_quietly
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.last_id = 0
+        self.done = 0
+        self.failed = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text())
+            self.last_id = data.get('last_id', 0)
+            self.done = data.get('done', 0)
+            self.failed = {int(k): v for k, v in data.get('failed', {}).items()}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({
+            'last_id': self.last_id,
+            'done': self.done,
+            'failed': {str(k): v for k, v in self.failed.items()},
+        }))
+        os.replace(tmp, self.path)
+
+
+class Command(BaseCommand):
+    help = 'Reclassify existing clips in parallel and replace their tags (resumable).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--max-in-flight', type=int, default=None, help='Clips queued at once (default: 2 x workers).')
+        parser.add_argument('--rate', type=float, default=0, help='Max clips started per second (0 = unlimited).')
+        parser.add_argument('--batch-size', type=int, default=50, help='Results per bulk tag write and checkpoint.')
+        parser.add_argument('--frames', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--untagged-only', action='store_true')
+        parser.add_argument('--retry-failed', action='store_true', help='Only retry clips that failed in earlier runs.')
+        parser.add_argument('--checkpoint', default=None)
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint.')
+        parser.add_argument('--download-timeout', type=float, default=60)
+        parser.add_argument(
+            '--use-cache', action='store_true',
+            help='Reuse cached labels instead of reclassifying (fresh labels are always stored).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Classify but do not write tags.')
+        parser.add_argument('--report-every', type=float, default=10, help='Seconds between progress lines.')
+
+    def handle(self, *args, **opts):
+        if opts['workers'] < 1 or opts['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be at least 1.')
+        checkpoint_path = opts['checkpoint'] or Path(settings.BASE_DIR) / 'reclassify_checkpoint.json'
+        if opts['restart']:
+            remove_quietly(checkpoint_path)
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.dry_run = opts['dry_run']
+
+        clips = Clip.objects.order_by('id')
+        if opts['retry_failed']:
+            clips = clips.filter(id__in=list(self.checkpoint.failed))
+        else:
+            clips = clips.filter(id__gt=self.checkpoint.last_id)
+        if opts['untagged_only']:
+            clips = clips.filter(tags__isnull=True)
+        total = clips.count()
+        if opts['limit'] is not None:
+            total = min(total, opts['limit'])
+            clips = clips[:total]
+        self.stdout.write(f'Reclassifying {total} clips with {opts["workers"]} workers '
+                          f'(resuming after clip {self.checkpoint.last_id})')
+        if not total:
+            return
+
+        max_in_flight = opts['max_in_flight'] or 2 * opts['workers']
+        interval = 1.0 / opts['rate'] if opts['rate'] > 0 else 0
+        self.pending = deque()  # submitted ids in order, to advance the checkpoint watermark
+        self.finished = set()
+        self.results = {}
+        self.unflushed = 0
+        processed = failed = 0
+        started = last_report = time.monotonic()
+        next_start = started
+
+        with ProcessPoolExecutor(
+            max_workers=opts['workers'],
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+        ) as pool:
+            in_flight = set()
+
+            def collect(futures):
+                nonlocal processed, failed
+                for future in futures:
+                    clip_id, labels, error = future.result()
+                    processed += 1
+                    if error:
+                        failed += 1
+                        self.checkpoint.failed[clip_id] = error
+                        self.stderr.write(f'clip {clip_id}: {error}')
+                    else:
+                        self.checkpoint.failed.pop(clip_id, None)
+                        self.results[clip_id] = labels
+                    self.finished.add(clip_id)
+                    self.unflushed += 1
+                if self.unflushed >= opts['batch_size']:
+                    self.flush()
+
+            try:
+                for clip_id, url in clips.values_list('id', 'clipUrl').iterator(chunk_size=500):
+                    while len(in_flight) >= max_in_flight:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    if interval:
+                        delay = next_start - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                        next_start = max(next_start, time.monotonic() - interval) + interval
+                    self.pending.append(clip_id)
+                    in_flight.add(pool.submit(
+                        classify_clip, clip_id, url, opts['frames'], opts['download_timeout'], opts['use_cache'],
+                    ))
+
+                    now = time.monotonic()
+                    if now - last_report >= opts['report_every']:
+                        last_report = now
+                        self._report(processed, failed, total, now - started)
+                while in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                    now = time.monotonic()
+                    if now - last_report >= opts['report_every']:
+                        last_report = now
+                        self._report(processed, failed, total, now - started)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+                self.flush()
+
+        self._report(processed, failed, total, time.monotonic() - started)
+        self.stdout.write(self.style.SUCCESS(f'Done. Checkpoint: {checkpoint_path}'))
+
+    def flush(self):
+        """Write finished tags in one transaction and move the checkpoint forward."""
+        if self.results and not self.dry_run:
+            with transaction.atomic():
+                replace_labels(self.results)
+        self.checkpoint.done += len(self.results)
+        self.results = {}
+        self.unflushed = 0
+        # Workers finish out of order; only ids with everything before them done are safe to skip next time
+        while self.pending and self.pending[0] in self.finished:
+            clip_id = self.pending.popleft()
+            self.finished.discard(clip_id)
+            self.checkpoint.last_id = max(self.checkpoint.last_id, clip_id)
+        if not self.dry_run:
+            self.checkpoint.save()
+
+    def _report(self, processed, failed, total, elapsed):
+        rate = processed / elapsed if elapsed > 0 else 0
+        eta = (total - processed) / rate if rate else float('inf')
+        self.stdout.write(
+            f'{processed}/{total} clips ({failed} failed) '
+            f'{rate:.2f} clips/s, {rate * 3600:.0f}/h, ETA {eta / 60:.1f} min'
+        )
@@ -0,0 +1,206 @@
+"""Generate synthetic users, clips and engagement for benchmarking.
+
+    python manage.py seed_synthetic_data --users 1000 --clips-per-user 5
+
+Every row is created with bulk_create so large scales stay fast. Usernames
+and emails are prefixed (--prefix) so a run can be told apart from real data
+and wiped with --flush.
+"""
+import random
+from collections import Counter
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import UserProfile
+from chat.models import ChatRoom, Message, UnreadCounter
+from features.models import Clip, Comment, Follows, Like, TaggedVideo, VideoCategory
+from Posts.models import UserMetadata
+
+
+CATEGORY_NAMES = [
+    'Sports', 'Animals', 'Food', 'Cooking', 'Technology', 'Nature', 'People', 'Car', 'Funny',
+    'Racing', 'Romance', 'Music', 'Travel', 'Adventure', 'Relaxing', 'Dance', 'Fashion', 'Motivation',
+]
+WORDS = ['wow', 'nice', 'first', 'lol', 'great', 'clip', 'amazing', 'cool', 'fire', 'love', 'this', 'again']
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic data (users, follows, clips, tags, likes, comments, metadata, chats) at a given scale.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--clips-per-user', type=int, default=3)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--likes-per-user', type=int, default=30)
+        parser.add_argument('--comments-per-user', type=int, default=10)
+        parser.add_argument('--tags-per-clip', type=int, default=3)
+        parser.add_argument('--rooms-per-user', type=int, default=3)
+        parser.add_argument('--messages-per-room', type=int, default=20)
+        parser.add_argument('--prefix', default='synth_')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--flush', action='store_true', help='Delete previously generated rows with this prefix first.')
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+        prefix = opts['prefix']
+        batch = opts['batch_size']
+
+        if opts['flush']:
+            self._flush(prefix)
+
+        with transaction.atomic():
+            categories = self._categories()
+            users = self._users(prefix, opts['users'], batch)
+            profiles = self._profiles(prefix, users, rng, batch)
+            self._follows(users, opts['follows_per_user'], rng, batch)
+            clips = self._clips(users, opts['clips_per_user'], rng, batch)
+            self._tags(clips, categories, opts['tags_per_clip'], rng, batch)
+            self._likes(users, clips, opts['likes_per_user'], rng, batch)
+            self._comments(users, clips, opts['comments_per_user'], rng, batch)
+            self._metadata(profiles, categories, rng, batch)
+            self._chats(users, clips, opts['rooms_per_user'], opts['messages_per_room'], rng, batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(users)} users, {len(clips)} clips with prefix {prefix!r}'
+        ))
+
+    def _flush(self, prefix):
+        # Clip.uploader is SET_NULL, so clips (with their tags, likes and
+        # comments) and chat rooms would outlive their seeded users
+        users = User.objects.filter(username__startswith=prefix)
+        with transaction.atomic():
+            clips, _ = Clip.objects.filter(uploader__in=users).delete()
+            rooms, _ = ChatRoom.objects.filter(id__in=ChatRoom.objects.filter(participants__in=users).values('id')).delete()
+            deleted, _ = users.delete()
+        self.stdout.write(f'Flushed {clips + rooms + deleted} rows for prefix {prefix!r}')
+
+    def _categories(self):
+        VideoCategory.objects.bulk_create(
+            [VideoCategory(name=name) for name in CATEGORY_NAMES], ignore_conflicts=True
+        )
+        return list(VideoCategory.objects.filter(name__in=CATEGORY_NAMES))
+
+    def _users(self, prefix, count, batch):
+        start = User.objects.filter(username__startswith=prefix).count()
+        password = make_password('benchmark-password')
+        User.objects.bulk_create(
+            [User(username=f'{prefix}{start + i}', password=password) for i in range(count)],
+            batch_size=batch,
+        )
+        return list(User.objects.filter(username__startswith=prefix).order_by('id')[start:start + count])
+
+    def _profiles(self, prefix, users, rng, batch):
+        profiles = [
+            UserProfile(
+                name=f'Synthetic {u.username}',
+                email=f'{u.username}@example.com',
+                dob=date(rng.randint(1970, 2008), rng.randint(1, 12), rng.randint(1, 28)),
+                user=u,
+                bio=' '.join(rng.choices(WORDS, k=6)),
+            )
+            for u in users
+        ]
+        UserProfile.objects.bulk_create(profiles, batch_size=batch)
+        return list(UserProfile.objects.filter(user__in=users))
+
+    def _follows(self, users, per_user, rng, batch):
+        rows = []
+        for u in users:
+            for other in rng.sample(users, min(per_user, len(users))):
+                if other.id != u.id:
+                    rows.append(Follows(follower=u, following=other))
+        Follows.objects.bulk_create(rows, batch_size=batch)
+
+    def _clips(self, users, per_user, rng, batch):
+        rows = [
+            Clip(
+                caption=' '.join(rng.choices(WORDS, k=5)),
+                clipUrl=f'https://example.com/clips/{u.id}/{i}.mp4',
+                uploader=u,
+            )
+            for u in users for i in range(per_user)
+        ]
+        Clip.objects.bulk_create(rows, batch_size=batch)
+        return list(Clip.objects.filter(uploader__in=users).order_by('id'))
+
+    def _tags(self, clips, categories, per_clip, rng, batch):
+        rows = [
+            TaggedVideo(clip=clip, category=category)
+            for clip in clips
+            for category in rng.sample(categories, min(per_clip, len(categories)))
+        ]
+        TaggedVideo.objects.bulk_create(rows, batch_size=batch)
+
+    def _likes(self, users, clips, per_user, rng, batch):
+        if not clips:
+            return
+        rows = []
+        like_counts = {}
+        for u in users:
+            for clip in rng.sample(clips, min(per_user, len(clips))):
+                rows.append(Like(user=u, clip=clip))
+                like_counts[clip.id] = like_counts.get(clip.id, 0) + 1
+        Like.objects.bulk_create(rows, batch_size=batch)
+        for clip in clips:
+            clip.likeCount = like_counts.get(clip.id, 0)
+            clip.viewCount = clip.likeCount * rng.randint(2, 20)
+        Clip.objects.bulk_update(clips, ['likeCount', 'viewCount'], batch_size=batch)
+
+    def _comments(self, users, clips, per_user, rng, batch):
+        if not clips:
+            return
+        rows = [
+            Comment(user=u, clip=rng.choice(clips), comment=' '.join(rng.choices(WORDS, k=rng.randint(1, 8))))
+            for u in users for _ in range(per_user)
+        ]
+        Comment.objects.bulk_create(rows, batch_size=batch)
+
+    def _metadata(self, profiles, categories, rng, batch):
+        rows = [
+            UserMetadata(name=profile, categories=category, weights=round(rng.uniform(-1, 1), 3))
+            for profile in profiles
+            for category in rng.sample(categories, min(6, len(categories)))
+        ]
+        UserMetadata.objects.bulk_create(rows, batch_size=batch)
+
+    def _chats(self, users, clips, rooms_per_user, messages_per_room, rng, batch):
+        if len(users) < 2:
+            return
+        pairs = []
+        for u in users:
+            for other in rng.sample(users, min(rooms_per_user, len(users))):
+                if other.id != u.id:
+                    pairs.append((u, other))
+        rooms = ChatRoom.objects.bulk_create([ChatRoom() for _ in pairs], batch_size=batch)
+        Through = ChatRoom.participants.through
+        Through.objects.bulk_create(
+            [Through(chatroom_id=room.id, user_id=user.id) for room, pair in zip(rooms, pairs) for user in pair],
+            batch_size=batch,
+        )
+        messages = []
+        for room, pair in zip(rooms, pairs):
+            for _ in range(messages_per_room):
+                shared = rng.random() < 0.1 and clips
+                messages.append(Message(
+                    room=room,
+                    sender=rng.choice(pair),
+                    content=None if shared else ' '.join(rng.choices(WORDS, k=rng.randint(1, 10))),
+                    video=rng.choice(clips) if shared else None,
+                    is_read=rng.random() < 0.7,
+                ))
+        Message.objects.bulk_create(messages, batch_size=batch)
+        # Keep the inbox badges consistent with the seeded is_read flags (see chat/unread.py)
+        unread = Counter((m.room.id, m.sender.id) for m in messages if not m.is_read)
+        UnreadCounter.objects.bulk_create(
+            [
+                UnreadCounter(room=room, user=user, count=unread[room.id, other.id])
+                for room, pair in zip(rooms, pairs)
+                for user, other in (pair, pair[::-1])
+            ],
+            batch_size=batch,
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('features', '0003_clip_uploader'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('labels', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('clip', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='job', to='features.clip')),
+            ],
+        ),
+    ]
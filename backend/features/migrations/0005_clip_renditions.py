@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('features', '0004_classificationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clip',
+            name='poster',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='clip',
+            name='preview',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='clip',
+            name='sprite',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:16
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('features', '0005_clip_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(blank=True, default='', max_length=255)),
+                ('total_size', models.BigIntegerField(blank=True, null=True)),
+                ('received_bytes', models.BigIntegerField(default=0)),
+                ('next_chunk', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('committed', 'Committed'), ('aborted', 'Aborted')], default='open', max_length=16)),
+                ('prefix_sampled', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('clip', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='features.clip')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
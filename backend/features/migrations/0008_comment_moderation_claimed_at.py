@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('features', '0007_comment_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='moderation_claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 
 # Create your models here.
@@ -8,17 +10,65 @@ class Clip(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     likeCount = models.IntegerField(default=0)
     viewCount = models.IntegerField(default=0)
+    # Storage names of the renditions built at upload (see features/renditions.py)
+    poster = models.CharField(max_length=255, blank=True, default='')
+    sprite = models.CharField(max_length=255, blank=True, default='')
+    preview = models.CharField(max_length=255, blank=True, default='')
+
+    def media_urls(self, request=None):
+        """Rendition URLs for API responses (absolute when a request is given)."""
+        from django.core.files.storage import default_storage
+
+        def url(name):
+            if not name:
+                return None
+            location = default_storage.url(name)
+            return request.build_absolute_uri(location) if request is not None else location
+
+        return {
+            'posterUrl': url(self.poster),
+            'spriteUrl': url(self.sprite),
+            'previewUrl': url(self.preview),
+        }
 
 class Like(models.Model):
     clip = models.ForeignKey(Clip, related_name='likes', on_delete=models.CASCADE)
     user = models.ForeignKey('auth.User', related_name='likes', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+class CommentQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Published comments, plus `user`'s own comments still awaiting moderation."""
+        return self.filter(
+            models.Q(status=Comment.STATUS_PUBLISHED)
+            | models.Q(status=Comment.STATUS_PENDING, user_id=getattr(user, 'id', None))
+        )
+
+
 class Comment(models.Model):
+    # New comments start pending; `manage.py moderate_comments` publishes or rejects them
+    STATUS_PENDING = 'pending'
+    STATUS_PUBLISHED = 'published'
+    STATUS_REJECTED = 'rejected'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PUBLISHED, 'Published'),
+        (STATUS_REJECTED, 'Rejected'),
+    ]
+
     clip = models.ForeignKey(Clip, related_name='comments', on_delete=models.CASCADE)
     user = models.ForeignKey('auth.User', related_name='comments', on_delete=models.CASCADE)
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PUBLISHED)
+    moderation_label = models.CharField(max_length=32, blank=True, default='')
+    # Set while a moderate_comments worker is classifying the row; stale claims expire
+    moderation_claimed_at = models.DateTimeField(null=True, blank=True)
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'], name='comment_status_id_idx')]
 
 class views(models.Model):
     clip = models.ForeignKey(Clip, related_name='views', on_delete=models.CASCADE)
@@ -36,4 +86,47 @@ class VideoCategory(models.Model):
 class TaggedVideo(models.Model):
     clip = models.ForeignKey(Clip, related_name='tags', on_delete=models.CASCADE)
     category = models.ForeignKey(VideoCategory, related_name='tagged_videos', on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class ClassificationJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    clip = models.OneToOneField(Clip, related_name='job', on_delete=models.CASCADE)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    labels = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload (see the uploads endpoints in features/views.py)."""
+    STATUS_OPEN = 'open'
+    STATUS_COMMITTED = 'committed'
+    STATUS_ABORTED = 'aborted'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_COMMITTED, 'Committed'),
+        (STATUS_ABORTED, 'Aborted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('auth.User', related_name='upload_sessions', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255, blank=True, default='')
+    total_size = models.BigIntegerField(null=True, blank=True)
+    received_bytes = models.BigIntegerField(default=0)
+    next_chunk = models.IntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    prefix_sampled = models.BooleanField(default=False)
+    clip = models.ForeignKey(Clip, related_name='upload_sessions', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,57 @@
+"""Worker side of the reclassify_clips backfill.
+
+Runs in spawned ProcessPoolExecutor workers, so nothing here may import
+models at module level: the module is imported (to unpickle init_worker)
+before django.setup() has run in the child.
+"""
+import os
+import tempfile
+import urllib.request
+from pathlib import Path
+
+from features.uploads import remove_quietly, upload_tmp_dir
+
+
+def init_worker():
+    # Workers are spawned, not forked, so they never share the parent's DB
+    # connection (which is mid-way through a server-side cursor). A spawned
+    # interpreter has to load the app registry itself before anything imports
+    # models.
+    import django
+
+    django.setup()
+
+
+def _fetch(url, timeout):
+    if os.path.exists(url):
+        return url, False
+    fd, path = tempfile.mkstemp(dir=upload_tmp_dir(), suffix=Path(url.split('?')[0]).suffix[:8])
+    try:
+        with os.fdopen(fd, 'wb') as out, urllib.request.urlopen(url, timeout=timeout) as response:
+            for chunk in iter(lambda: response.read(1024 * 1024), b''):
+                out.write(chunk)
+    except Exception:
+        remove_quietly(path)
+        raise
+    return path, True
+
+
+def classify_clip(clip_id, url, num_frames, timeout, use_cache=False):
+    """Worker: returns (clip_id, labels, error).
+
+    Unless use_cache is set, the label cache is only written: serving cached
+    labels would hand back the very tags the backfill is meant to replace.
+    """
+    from features.video_classification import classify_video
+
+    try:
+        path, downloaded = _fetch(url, timeout)
+    except Exception as e:
+        return clip_id, None, f'download failed: {e}'
+    try:
+        return clip_id, classify_video(path, num_frames=num_frames, refresh=not use_cache), None
+    except Exception as e:
+        return clip_id, None, str(e)
+    finally:
+        if downloaded:
+            remove_quietly(path)
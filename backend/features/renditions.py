@@ -0,0 +1,105 @@
+"""Lightweight renditions of an uploaded clip for feeds and grids.
+
+Built by the classification worker from the keyframes it has already
+decoded:
+
+  poster.jpg   one representative frame, CLIP_POSTER_MAX_EDGE on the long side
+  sprite.jpg   the keyframes side by side at CLIP_SPRITE_TILE_HEIGHT
+  preview.mp4  optional (CLIP_PREVIEW_CLIP_ENABLED): the first
+               CLIP_PREVIEW_SECONDS at low resolution and frame rate
+
+Files are written to default_storage under clip_previews/<clip id>/ and the
+storage names are kept on the Clip (poster / sprite / preview).
+"""
+import os
+import tempfile
+
+import cv2
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .video_classification import downscale, sample_frames
+
+
+def _jpeg(frame, quality):
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode rendition")
+    return buffer.tobytes()
+
+
+def _save(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, content)
+
+
+def build_poster(frame):
+    return _jpeg(downscale(frame, int(getattr(settings, 'CLIP_POSTER_MAX_EDGE', 480))), 82)
+
+
+def build_sprite(frames):
+    tile_height = int(getattr(settings, 'CLIP_SPRITE_TILE_HEIGHT', 120))
+    height, width = frames[0].shape[:2]
+    tile_width = max(1, int(width * tile_height / height))
+    tiles = [cv2.resize(f, (tile_width, tile_height), interpolation=cv2.INTER_AREA) for f in frames]
+    return _jpeg(cv2.hconcat(tiles), 75)
+
+
+def write_preview_clip(video_path, out_path):
+    """Re-encode the start of the video small and at a low frame rate. Returns False if nothing was written."""
+    seconds = float(getattr(settings, 'CLIP_PREVIEW_SECONDS', 3))
+    target_fps = float(getattr(settings, 'CLIP_PREVIEW_FPS', 12))
+    max_edge = int(getattr(settings, 'CLIP_PREVIEW_MAX_EDGE', 320))
+    cap = cv2.VideoCapture(video_path)
+    writer = None
+    written = 0
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        stride = max(1, int(round(fps / target_fps)))
+        limit = int(fps * seconds)
+        index = 0
+        while index < limit and cap.grab():
+            if index % stride == 0:
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                frame = downscale(frame, max_edge)
+                if writer is None:
+                    h, w = frame.shape[:2]
+                    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), fps / stride, (w - w % 2, h - h % 2))
+                writer.write(frame[:frame.shape[0] - frame.shape[0] % 2, :frame.shape[1] - frame.shape[1] % 2])
+                written += 1
+            index += 1
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+    return written > 0
+
+
+def render_clip_media(clip_id, video_path, keyframes=None):
+    """Create the renditions for a clip; returns {'poster', 'sprite', 'preview'} storage names."""
+    if not keyframes:
+        # e.g. the labels came from the cache and nothing was decoded yet
+        keyframes = [downscale(f, int(getattr(settings, 'KEYFRAME_MAX_EDGE', 768)))
+                     for f in sample_frames(video_path, num_frames=5)]
+    result = {'poster': '', 'sprite': '', 'preview': ''}
+    if not keyframes:
+        return result
+    base = f'clip_previews/{clip_id}'
+    result['poster'] = _save(f'{base}/poster.jpg', ContentFile(build_poster(keyframes[len(keyframes) // 2])))
+    result['sprite'] = _save(f'{base}/sprite.jpg', ContentFile(build_sprite(keyframes)))
+
+    if getattr(settings, 'CLIP_PREVIEW_CLIP_ENABLED', False):
+        fd, tmp_path = tempfile.mkstemp(suffix='.mp4')
+        os.close(fd)
+        try:
+            if write_preview_clip(video_path, tmp_path):
+                with open(tmp_path, 'rb') as fh:
+                    result['preview'] = _save(f'{base}/preview.mp4', File(fh))
+        finally:
+            os.remove(tmp_path)
+    return result
@@ -0,0 +1,29 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.dispatch import Signal, receiver
+
+
+# Sent by features.jobs once a clip's classification job has finished.
+# kwargs: clip_id, status, labels
+tags_ready = Signal()
+
+
+def clip_group_name(clip_id):
+    return f"clip_{clip_id}"
+
+
+@receiver(tags_ready)
+def broadcast_tags_ready(sender, clip_id, status, labels, **kwargs):
+    """Forward the event to websocket clients watching this clip."""
+    try:
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        async_to_sync(channel_layer.group_send)(clip_group_name(clip_id), {
+            "type": "tags_ready",
+            "clip_id": clip_id,
+            "status": status,
+            "labels": labels,
+        })
+    except Exception as e:
+        print(f"broadcast_tags_ready: could not notify clip {clip_id}: {e}")
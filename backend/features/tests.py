@@ -1,3 +1,146 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import tempfile
+import threading
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from .label_cache import LabelCache
+from .uploads import ChunkError, append_chunk, spool_chunk
+from .video_classification import classify_frames
+
+
+class ClassifyFramesTests(SimpleTestCase):
+    def test_frames_are_split_into_batches_in_order(self):
+        sizes = []
+        lock = threading.Lock()
+
+        def request_fn(batch):
+            with lock:
+                sizes.append(len(batch))
+            return [f'["frame {frame}"]' for frame in batch]
+
+        labels = classify_frames(range(7), request_fn=request_fn, max_concurrency=3, batch_size=3, retries=0)
+
+        self.assertEqual(sorted(sizes), [1, 3, 3])
+        self.assertEqual(labels, [f'["frame {i}"]' for i in range(7)])
+
+    def test_failed_request_is_retried(self):
+        calls = []
+
+        def request_fn(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise ConnectionError('flaky')
+            return ['["Sports"]'] * len(batch)
+
+        labels = classify_frames(['a', 'b'], request_fn=request_fn, batch_size=2, retries=2, backoff=0)
+
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual(labels, ['["Sports"]', '["Sports"]'])
+
+    def test_exhausted_retries_give_empty_labels(self):
+        calls = []
+        lock = threading.Lock()
+
+        def request_fn(batch):
+            with lock:
+                calls.append(len(batch))
+            raise TimeoutError('backend down')
+
+        labels = classify_frames(range(5), request_fn=request_fn, batch_size=2, retries=2, backoff=0)
+
+        self.assertEqual(labels, ['[]'] * 5)
+        # 3 batches, each tried once plus 2 retries
+        self.assertEqual(sorted(calls), [1, 1, 1, 2, 2, 2, 2, 2, 2])
+
+    def test_no_frames_makes_no_requests(self):
+        def request_fn(batch):
+            raise AssertionError('should not be called')
+
+        self.assertEqual(classify_frames([], request_fn=request_fn), [])
+
+
+class LabelCacheVersionTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'labels.sqlite3')
+
+    def test_entries_only_match_their_classifier_version(self):
+        old = LabelCache(self.path, max_distance=6, version='old-backend')
+        old.put_video('digest', [('Sports', 3)])
+        old.put_frame(12345, '["Sports"]')
+
+        new = LabelCache(self.path, max_distance=6, version='new-backend')
+
+        self.assertIsNone(new.get_video('digest'))
+        self.assertIsNone(new.get_frame(12345))
+        self.assertIsNone(new.get_frame(12344))  # nor via the near-duplicate search
+        self.assertEqual(old.get_video('digest'), [('Sports', 3)])
+        self.assertEqual(old.get_frame(12344), '["Sports"]')
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class AppendChunkTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.part')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(b'first')
+        self.addCleanup(os.remove, self.path)
+
+    def contents(self):
+        with open(self.path, 'rb') as fh:
+            return fh.read()
+
+    def test_appends_at_offset(self):
+        written = append_chunk(self.path, 5, io.BytesIO(b'second'), sha256(b'second'), limit=100)
+
+        self.assertEqual(written, 6)
+        self.assertEqual(self.contents(), b'firstsecond')
+
+    def test_checksum_mismatch_truncates_back_to_offset(self):
+        with self.assertRaisesMessage(ChunkError, 'Checksum mismatch.'):
+            append_chunk(self.path, 5, io.BytesIO(b'second'), sha256(b'other'), limit=100)
+
+        self.assertEqual(self.contents(), b'first')
+
+    def test_oversized_chunk_is_refused_and_truncated(self):
+        with self.assertRaises(ChunkError) as cm:
+            append_chunk(self.path, 5, io.BytesIO(b'x' * 200 * 1024), sha256(b'x' * 200 * 1024), limit=100 * 1024)
+
+        self.assertEqual(cm.exception.status, 413)
+        self.assertEqual(self.contents(), b'first')
+
+    def test_resent_chunk_replaces_a_partial_tail(self):
+        with open(self.path, 'ab') as fh:
+            fh.write(b'sec')  # left over from a dropped connection
+
+        append_chunk(self.path, 5, io.BytesIO(b'second'), sha256(b'second'), limit=100)
+
+        self.assertEqual(self.contents(), b'firstsecond')
+
+
+class SpoolChunkTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp_dir = tmp.name
+        self.enterContext(override_settings(CLIP_UPLOAD_TMP_DIR=self.tmp_dir))
+
+    def test_verified_body_is_spooled(self):
+        path = spool_chunk(io.BytesIO(b'body'), sha256(b'body'), limit=100)
+
+        with open(path, 'rb') as fh:
+            self.assertEqual(fh.read(), b'body')
+
+    def test_bad_body_leaves_no_file(self):
+        for body, checksum in [(b'body', sha256(b'other')), (b'', sha256(b''))]:
+            with self.assertRaises(ChunkError):
+                spool_chunk(io.BytesIO(body), checksum, limit=100)
+
+        self.assertEqual(os.listdir(self.tmp_dir), [])
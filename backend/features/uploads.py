@@ -0,0 +1,159 @@
+"""Hand-off of uploaded video files to the classification worker.
+
+Uploads are never read into memory as a whole: Django's
+TemporaryUploadedFile is moved into CLIP_UPLOAD_TMP_DIR as-is, and smaller
+in-memory uploads are written out chunk by chunk. The sha256 used by the
+label cache is computed on the way.
+
+Resumable uploads (UploadSession) append numbered chunks to
+CLIP_UPLOAD_TMP_DIR/sessions/<id>.part; a chunk whose checksum does not
+match is truncated away again. Chunk bodies are spooled to their own temp
+file before the session row is locked. Sessions left open for longer than
+CLIP_UPLOAD_SESSION_TTL are aborted by expire_sessions (run on session
+create and by `manage.py expire_upload_sessions`).
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def upload_tmp_dir() -> Path:
+    directory = Path(getattr(settings, 'CLIP_UPLOAD_TMP_DIR', Path(settings.BASE_DIR) / 'temp_uploads'))
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def max_upload_size():
+    return int(getattr(settings, 'CLIP_MAX_UPLOAD_SIZE', 200 * 1024 * 1024))
+
+
+def _suffix(name):
+    suffix = Path(name or '').suffix.lower()
+    return suffix if suffix.isascii() and len(suffix) <= 8 else ''
+
+
+def stash_upload(uploaded_file):
+    """Persist an UploadedFile for background processing; returns (path, sha256)."""
+    fd, path = tempfile.mkstemp(dir=upload_tmp_dir(), suffix=_suffix(uploaded_file.name))
+    digest = hashlib.sha256()
+    try:
+        if hasattr(uploaded_file, 'temporary_file_path'):
+            os.close(fd)
+            source = uploaded_file.temporary_file_path()
+            # Django ignores the missing file when it later tries to delete it
+            shutil.move(source, path)
+            with open(path, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        else:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in uploaded_file.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+    except Exception:
+        remove_quietly(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ChunkError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def session_path(session) -> Path:
+    directory = upload_tmp_dir() / 'sessions'
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f'{session.id}.part'
+
+
+def max_chunk_size():
+    return int(getattr(settings, 'CLIP_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024))
+
+
+def _copy_verified(stream, out, expected_sha256, limit):
+    digest = hashlib.sha256()
+    written = 0
+    while True:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            break
+        written += len(chunk)
+        if written > limit:
+            raise ChunkError(f'Chunk too large (max {limit} bytes).', status=413)
+        digest.update(chunk)
+        out.write(chunk)
+    if written == 0:
+        raise ChunkError('Empty chunk.')
+    if digest.hexdigest() != expected_sha256.lower():
+        raise ChunkError('Checksum mismatch.')
+    return written
+
+
+def spool_chunk(stream, expected_sha256, limit):
+    """Copy a chunk body to its own temp file, verifying size and sha256; returns the path.
+
+    Lets the (slow) network read happen before the session row is locked.
+    """
+    fd, path = tempfile.mkstemp(dir=upload_tmp_dir(), suffix='.chunk')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            _copy_verified(stream, out, expected_sha256, limit)
+    except Exception:
+        remove_quietly(path)
+        raise
+    return path
+
+
+def append_chunk(path, offset, stream, expected_sha256, limit):
+    """Append `stream` to `path` at `offset`, verifying its sha256.
+
+    Reads at most `limit` bytes. On a checksum mismatch or an oversized body
+    the file is truncated back to `offset`. Returns the number of bytes added.
+    """
+    with open(path, 'ab') as out:
+        out.truncate(offset)
+        try:
+            return _copy_verified(stream, out, expected_sha256, limit)
+        except Exception:
+            out.flush()
+            out.truncate(offset)
+            raise
+
+
+def session_ttl():
+    return int(getattr(settings, 'CLIP_UPLOAD_SESSION_TTL', 24 * 3600))
+
+
+def expire_sessions(sessions):
+    """Abort the open sessions in `sessions` idle for longer than CLIP_UPLOAD_SESSION_TTL.
+
+    Deletes their partial files; returns how many were aborted.
+    """
+    model = sessions.model
+    now = timezone.now()
+    stale = sessions.filter(status=model.STATUS_OPEN, updated_at__lt=now - timedelta(seconds=session_ttl()))
+    ids = list(stale.values_list('id', flat=True))
+    if not ids:
+        return 0
+    expired = model.objects.filter(id__in=ids, status=model.STATUS_OPEN).update(
+        status=model.STATUS_ABORTED, updated_at=now,
+    )
+    directory = upload_tmp_dir() / 'sessions'
+    for session_id in ids:
+        remove_quietly(directory / f'{session_id}.part')
+    return expired
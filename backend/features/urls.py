@@ -15,6 +15,11 @@ from .views import (
     getLikedVideos,
     getMyClips,
     getClip,
+    getClipJobStatus,
+    createUploadSession,
+    uploadSession,
+    uploadChunk,
+    commitUploadSession,
 )
 
 urlpatterns = [
@@ -32,5 +37,10 @@ urlpatterns = [
     path('postClip/',postClip, name='postClip'),
     path('myClips/', getMyClips, name='getMyClips'),
     path('getClip/', getClip, name='getClip'),
+    path('clipStatus/', getClipJobStatus, name='getClipJobStatus'),
+    path('uploads/', createUploadSession, name='createUploadSession'),
+    path('uploads/<uuid:session_id>/', uploadSession, name='uploadSession'),
+    path('uploads/<uuid:session_id>/chunks/<int:index>/', uploadChunk, name='uploadChunk'),
+    path('uploads/<uuid:session_id>/commit/', commitUploadSession, name='commitUploadSession'),
     path('fetchClips/',fetchClips, name='fetchClips'),
 ]
@@ -1,43 +1,143 @@
-import os
 import cv2
+import numpy as np
 import base64
 import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from PIL import Image
 from collections import Counter
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-load_dotenv()
-api_key = os.getenv("API_KEY")
-if not api_key:
-    raise ValueError("API_KEY not found in .env file")
-genai.configure(api_key=api_key)
-
-# List available models for debugging
-# try:
-#     models = genai.list_models()
-#     print("📋 Available models:")
-#     for model_info in models:
-#         print(f"  - {model_info.name}")
-# except Exception as e:
-#     print(f"Error listing models: {e}")
-
-model = genai.GenerativeModel("gemini-2.0-flash-lite")
-
-def extract_frames(video_path, every_n_frames=80):
+from django.conf import settings
+from .classifiers import get_classifier
+from .label_cache import file_digest, frame_phash, get_label_cache
+
+
+# Gaps (in frames) larger than this are crossed with a seek instead of grab()s
+SEEK_MIN_GAP = 120
+# Spacing of fallback samples when the container reports no frame count
+FALLBACK_INTERVAL_SECONDS = 2.0
+
+
+def sample_positions(frame_count, num_frames):
+    """Evenly spaced frame indices, taken from the middle of each segment."""
+    if frame_count <= 0 or num_frames <= 0:
+        return []
+    num_frames = min(num_frames, frame_count)
+    step = frame_count / num_frames
+    return [min(frame_count - 1, int(step * i + step / 2)) for i in range(num_frames)]
+
+
+def _grab_to(cap, position, target):
+    """Advance with grab() until `target` is the next frame; returns the new position."""
+    while position < target:
+        if not cap.grab():
+            return None
+        position += 1
+    return position
+
+
+def sample_frames(video_path, num_frames=5, fallback_every_n_frames=60):
+    """Lazily yield up to `num_frames` evenly spaced frames from a video.
+
+    The frame count and FPS are read up front and only the selected frames
+    are decoded: large gaps are crossed with a seek, short ones with grab(),
+    so time and memory do not grow with the length of the video. Positions
+    are frame indices (CAP_PROP_POS_FRAMES), which is what evenly spaced
+    timestamps come down to for a constant frame rate. When the container
+    does not report a frame count, a frame is yielded every
+    FALLBACK_INTERVAL_SECONDS (every `fallback_every_n_frames`th frame if the
+    FPS is unknown too) until `num_frames` have been produced.
+    """
     cap = cv2.VideoCapture(video_path)
-    frames = []
-    count = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
+    try:
+        if not cap.isOpened():
+            return
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        positions = sample_positions(frame_count, num_frames)
+        if not positions:
+            if fps > 0:
+                fallback_every_n_frames = max(1, round(fps * FALLBACK_INTERVAL_SECONDS))
+            yielded = 0
+            position = 0
+            while yielded < num_frames and cap.grab():
+                if position % fallback_every_n_frames == 0:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        yielded += 1
+                        yield frame
+                position += 1
+            return
+
+        position = 0
+        for target in positions:
+            if target - position > SEEK_MIN_GAP and cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+                position = target
+            else:
+                position = _grab_to(cap, position, target)
+                if position is None:
+                    return
+            ret, frame = cap.read()
+            if not ret:
+                return
+            position += 1
+            yield frame
+    finally:
+        cap.release()
+
+def downscale(frame, max_edge):
+    """Resize so the longer edge is at most `max_edge` pixels (never upscales)."""
+    if not max_edge:
+        return frame
+    height, width = frame.shape[:2]
+    scale = max_edge / max(height, width)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+def frame_signature(frame, bins=8):
+    """Normalised joint colour histogram of a heavily downscaled frame."""
+    small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+    quantised = (small // (256 // bins)).astype(np.int32).reshape(-1, 3)
+    index = (quantised[:, 0] * bins + quantised[:, 1]) * bins + quantised[:, 2]
+    hist = np.bincount(index, minlength=bins ** 3).astype(np.float32)
+    return hist / hist.sum()
+
+
+def select_keyframes(frames, k=5, min_distance=None, max_edge=None):
+    """Pick up to `k` mutually distinct frames, returned in temporal order.
+
+    Candidates are compared by colour histogram (L1 distance, 0..2). The first
+    pick is the frame furthest from the clip's average look; each following
+    pick maximises its distance to everything already chosen (farthest-point
+    selection), and selection stops early once the best remaining candidate is
+    closer than `min_distance` to the chosen set, so a static clip costs a
+    single classification. Kept candidates are downscaled to `max_edge`.
+    """
+    min_distance = float(getattr(settings, 'KEYFRAME_MIN_DISTANCE', 0.15)) if min_distance is None else min_distance
+    max_edge = max_edge or int(getattr(settings, 'KEYFRAME_MAX_EDGE', 768))
+    kept, signatures = [], []
+    for frame in frames:
+        kept.append(downscale(frame, max_edge))
+        signatures.append(frame_signature(frame))
+    if len(kept) <= 1 or k <= 0:
+        return kept[:max(k, 0)]
+
+    sigs = np.stack(signatures)
+    first = int(np.abs(sigs - sigs.mean(axis=0)).sum(axis=1).argmax())
+    chosen = [first]
+    nearest = np.abs(sigs - sigs[first]).sum(axis=1)
+    while len(chosen) < min(k, len(kept)):
+        candidate = int(nearest.argmax())
+        if nearest[candidate] < min_distance:
             break
-        if count % every_n_frames == 0:
-            frames.append(frame)
-        count += 1
-    cap.release()
-    return frames
+        chosen.append(candidate)
+        nearest = np.minimum(nearest, np.abs(sigs - sigs[candidate]).sum(axis=1))
+    return [kept[i] for i in sorted(chosen)]
+
 
 def encode_image(frame):
     img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
@@ -45,34 +145,102 @@ def encode_image(frame):
     img.save(buffer, format="JPEG")
     return base64.b64encode(buffer.getvalue()).decode("utf-8")
 
-def classify_frame(frame):
-    try:
-        b64_image = encode_image(frame)
-        print(f"🔍 Processing frame with image size: {len(b64_image)} characters")
 
-        response = model.generate_content([
-            "Classify this frame into high-level categories like [Sports, Animals, Food, Cooking, Technology, Nature, People, Car, Funny, Racing, Romance, Music, Travel, Adventure, Relaxing, Dance, Fashion, Motivation]. Respond ONLY with a JSON list of labels. No extra text, no markdown.",
-            {"mime_type": "image/jpeg", "data": b64_image}
-        ])
+class FrameEncoder:
+    """JPEG encoder for classification payloads.
+
+    Frames are downscaled to `max_edge` on the longer side and encoded
+    straight from BGR with cv2.imencode at `quality`, skipping the
+    BGR->RGB copy, the PIL image and the base64 pass of encode_image. Resize
+    output buffers are kept per thread and per shape and reused.
+    """
 
-        print(f"📡 API Response received. Has text: {hasattr(response, 'text')}")
-        print(f"📡 Response object: {response}")
-        print(f"📡 Response dir: {dir(response)}")
+    def __init__(self, max_edge=None, quality=None):
+        self.max_edge = int(max_edge or getattr(settings, 'CLASSIFY_ENCODE_MAX_EDGE', 512))
+        self.quality = int(quality or getattr(settings, 'CLASSIFY_JPEG_QUALITY', 80))
+        self._local = threading.local()
 
-        if hasattr(response, 'text') and response.text:
-            print(f"Response text: {response.text}")
-            return response.text.strip()
-        else:
-            print("No text in response")
-            return "[]"
+    def _resize(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.max_edge / max(height, width)
+        if scale >= 1:
+            return frame
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        key = (size, frame.shape[2:], frame.dtype.str)
+        dst = buffers.get(key)
+        if dst is None:
+            dst = buffers[key] = np.empty((size[1], size[0]) + frame.shape[2:], dtype=frame.dtype)
+        # Bilinear is an order of magnitude faster than INTER_AREA at non-integer
+        # ratios and the artefacts do not matter to the classifier.
+        return cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_LINEAR)
 
+    def encode(self, frame):
+        ok, buffer = cv2.imencode('.jpg', self._resize(frame), [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("Could not encode frame as JPEG")
+        return buffer.tobytes()
+
+    def payload(self, frame):
+        """Inline image part for generate_content: raw bytes, or base64 if the client needs text."""
+        data = self.encode(frame)
+        if not getattr(settings, 'CLASSIFY_SEND_RAW_BYTES', True):
+            data = base64.b64encode(data).decode("utf-8")
+        return {"mime_type": "image/jpeg", "data": data}
+
+
+frame_encoder = FrameEncoder()
+
+
+def classify_frame(frame):
+    try:
+        return get_classifier().classify([frame])[0]
     except Exception as e:
-        print(f"Error in classify_frame: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"Error in classify_frame: {e}")
         return "[]"
 
+
+def _with_retries(request_fn, batch, retries, backoff):
+    for attempt in range(retries + 1):
+        try:
+            return request_fn(batch)
+        except Exception as e:
+            if attempt == retries:
+                print(f"classify_frames: giving up on batch of {len(batch)} after {attempt + 1} attempts: {e}")
+                return ["[]"] * len(batch)
+            delay = backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+            print(f"classify_frames: attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+
+def classify_frames(frames, request_fn=None, max_concurrency=None, batch_size=None, retries=None, backoff=None):
+    """Classify frames concurrently; returns one raw label string per frame.
+
+    Frames are grouped into requests of `batch_size` images and at most
+    `max_concurrency` requests are in flight. Failed requests are retried with
+    exponential backoff and end up as "[]" once retries are exhausted.
+    `request_fn(frames) -> [label_text, ...]` defaults to the configured
+    classifier backend and can be swapped for a local stub.
+    """
+    frames = list(frames)
+    if not frames:
+        return []
+    request_fn = request_fn or get_classifier().classify
+    max_concurrency = max_concurrency or int(getattr(settings, 'CLASSIFY_MAX_CONCURRENCY', 4))
+    batch_size = max(1, batch_size or int(getattr(settings, 'CLASSIFY_BATCH_SIZE', 1)))
+    retries = int(getattr(settings, 'CLASSIFY_RETRIES', 3)) if retries is None else retries
+    backoff = float(getattr(settings, 'CLASSIFY_BACKOFF_SECONDS', 0.5)) if backoff is None else backoff
+
+    batches = [frames[i:i + batch_size] for i in range(0, len(frames), batch_size)]
+    if len(batches) == 1:
+        results = [_with_retries(request_fn, batches[0], retries, backoff)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as pool:
+            results = list(pool.map(lambda b: _with_retries(request_fn, b, retries, backoff), batches))
+    return [label for batch_labels in results for label in batch_labels]
+
 def aggregate_labels(frame_labels):
     all_labels = []
     for lbl in frame_labels:
@@ -86,3 +254,53 @@ def aggregate_labels(frame_labels):
     counts = Counter([x for x in all_labels if x])
     print("Label counts:", counts)
     return counts.most_common()
+
+
+def video_keyframes(video_path, num_frames=5):
+    """Sample KEYFRAME_CANDIDATES frames cheaply and keep the `num_frames` most distinct."""
+    candidates = max(num_frames, int(getattr(settings, 'KEYFRAME_CANDIDATES', 24)))
+    return select_keyframes(sample_frames(video_path, num_frames=candidates), k=num_frames)
+
+
+def classify_video(video_path, num_frames=5, digest=None, cache=None, frames_out=None, refresh=False):
+    """Classify a video's keyframes and return aggregated (label, count) pairs.
+
+    Results are looked up in / stored to the label cache: an identical file
+    (same sha256) returns straight from the cache, and frames close to an
+    already classified frame reuse its labels. Pass cache=False to bypass it,
+    or refresh=True to classify every frame and overwrite the cached entries.
+    Decoded keyframes are appended to `frames_out` when a list is given, so
+    callers can reuse them (nothing is appended on a whole-video cache hit).
+    """
+    if cache is None:
+        cache = get_label_cache()
+    if not cache:
+        frames = video_keyframes(video_path, num_frames)
+        if frames_out is not None:
+            frames_out.extend(frames)
+        return aggregate_labels(classify_frames(frames))
+
+    digest = digest or file_digest(video_path)
+    cached_labels = None if refresh else cache.get_video(digest)
+    if cached_labels is not None:
+        print(f"classify_video: cache hit for {digest[:12]}")
+        return cached_labels
+
+    frames = video_keyframes(video_path, num_frames)
+    if frames_out is not None:
+        frames_out.extend(frames)
+    hashes = [frame_phash(f) for f in frames]
+    frame_labels = [None if refresh else cache.get_frame(h) for h in hashes]
+    missing = [i for i, lbl in enumerate(frame_labels) if lbl is None]
+    if missing:
+        fresh = classify_frames([frames[i] for i in missing])
+        for i, lbl in zip(missing, fresh):
+            frame_labels[i] = lbl
+            if lbl and lbl != "[]":
+                cache.put_frame(hashes[i], lbl)
+    print(f"classify_video: {len(frames) - len(missing)}/{len(frames)} frames served from cache")
+
+    labels = aggregate_labels(frame_labels)
+    if labels:
+        cache.put_video(digest, labels)
+    return labels
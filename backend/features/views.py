@@ -2,12 +2,25 @@ from django.contrib.auth.models import User
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny,IsAuthenticated
 from rest_framework.response import Response
-from .models import Follows, Clip, Like,Comment
-from .video_classification import extract_frames, encode_image, classify_frame, aggregate_labels
-import os
+from .models import Follows, Clip, Like,Comment, ClassificationJob, UploadSession
+from .jobs import enqueue_classification, get_executor, warm_label_cache
+from .uploads import (
+    ChunkError,
+    append_chunk,
+    expire_sessions,
+    max_chunk_size,
+    max_upload_size,
+    remove_quietly,
+    session_path,
+    spool_chunk,
+    stash_upload,
+)
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+# Allowance for the form fields and multipart framing around an uploaded file
+MULTIPART_OVERHEAD = 64 * 1024
 
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 
 # Create your views here.
 @api_view(['GET'])
@@ -127,18 +140,22 @@ def addComment(request):
     content = request.data.get('content', '').strip()
     if not video_id or not content:
         return Response({'error': 'Both video_id and content are required.'}, status=400)
+    # Pending until the moderation worker publishes it (see comments.views.addComment)
     try:
-        video = Clip.objects.get(id=video_id)
-    except Clip.DoesNotExist:
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                user=user, clip_id=int(video_id), comment=content, status=Comment.STATUS_PENDING,
+            )
+    except (IntegrityError, TypeError, ValueError):
         return Response({'error': 'Video not found.'}, status=404)
-    comment = Comment.objects.create(user=user, clip=video, comment=content)
     return Response({
-        'message': 'Comment added.',
+        'message': 'Comment submitted for review.',
         'comment': {
             'id': comment.id,
             'user': user.username,
             'comment': comment.comment,
-            'created_at': comment.created_at
+            'created_at': comment.created_at,
+            'status': comment.status,
         }
     }, status=201)
 
@@ -166,13 +183,19 @@ def getComments(request):
         video = Clip.objects.get(id=videoId)
     except Clip.DoesNotExist:
         return Response({'error': 'Video not found.'}, status=404)
-    comments = Comment.objects.filter(clip=video).order_by('-created_at')
+    comments = (
+        Comment.objects.visible_to(request.user)
+        .filter(clip=video)
+        .select_related('user')
+        .order_by('-created_at')
+    )
     comments_data = [
         {
             'id': comment.id,
             'user': comment.user.username,
             'comment': comment.comment,
-            'created_at': comment.created_at
+            'created_at': comment.created_at,
+            'status': comment.status,
         }
         for comment in comments
     ]
@@ -182,44 +205,221 @@ def getComments(request):
 @permission_classes([IsAuthenticated])
 def postClip(request):
     user = request.user
+    # Refuse oversized bodies before request.POST/FILES parses and spools them
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > max_upload_size() + MULTIPART_OVERHEAD:
+        return Response({'error': f'File too large (max {max_upload_size()} bytes).'}, status=413)
     video_url = request.POST.get('video_url')
     description = request.POST.get('description', '').strip()
     video_file = request.FILES.get('file')
     if not video_url:
         return Response({'error': 'video_url is required.'}, status=400)
-    # Save the video file temporarily if present
-    temp_path = None
+    if video_file and video_file.size > max_upload_size():
+        return Response({'error': f'File too large (max {max_upload_size()} bytes).'}, status=413)
+    temp_path = digest = job = None
     if video_file:
-        temp_path = default_storage.save(f'temp_uploads/{video_file.name}', ContentFile(video_file.read()))
-        temp_full_path = default_storage.path(temp_path)
-        # Run classification pipeline
-        print("Here")
+        # Move the upload to disk without buffering it and let the background worker classify and tag it
+        temp_path, digest = stash_upload(video_file)
+    try:
+        # The clip only appears together with its job; the worker starts on commit
+        with transaction.atomic():
+            clip = Clip.objects.create(caption=description, clipUrl=video_url, uploader=user)
+            if temp_path:
+                job = ClassificationJob.objects.create(clip=clip)
+                enqueue_classification(job, temp_path, digest)
+    except Exception:
+        if temp_path:
+            remove_quietly(temp_path)
+        raise
+    return Response({
+        'message': 'Clip posted successfully.',
+        'clip_id': clip.id,
+        'job_id': job.id if job else None,
+        'status': job.status if job else None,
+        'labels': [],
+    }, status=202 if job else 200)
+
+
+def _session_data(session):
+    return {
+        'session_id': str(session.id),
+        'status': session.status,
+        'received_bytes': session.received_bytes,
+        'next_chunk': session.next_chunk,
+        'total_size': session.total_size,
+        'max_chunk_size': max_chunk_size(),
+        'clip_id': session.clip_id,
+    }
+
+
+def _chunk_rejection(session, index):
+    """The response for a chunk that must not be appended now, or None."""
+    if session.status != UploadSession.STATUS_OPEN:
+        return Response({'error': f'Upload session is {session.status}.', **_session_data(session)}, status=409)
+    if index < session.next_chunk:
+        return Response({'message': 'Chunk already received.', **_session_data(session)}, status=200)
+    if index > session.next_chunk:
+        return Response({'error': 'Chunk out of order.', **_session_data(session)}, status=409)
+    return None
+
+
+def _chunk_limit(session):
+    return min(max_chunk_size(), (session.total_size or max_upload_size()) - session.received_bytes)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def createUploadSession(request):
+    """Start a resumable upload. Accepts JSON { "filename": "...", "total_size": <bytes> }."""
+    total_size = request.data.get('total_size')
+    if total_size is not None:
         try:
-            print("Here22")
-            frames = extract_frames(temp_full_path, every_n_frames=60)
-            frame_labels = [classify_frame(f) for f in frames[:5]]
-            print(frame_labels)
-            final_labels = aggregate_labels(frame_labels)
-            print("done")
-        except Exception as e:
-            final_labels = []
-        # Optionally, delete the temp file after processing
+            total_size = int(total_size)
+        except (TypeError, ValueError):
+            return Response({'error': 'total_size must be an integer.'}, status=400)
+        if total_size <= 0 or total_size > max_upload_size():
+            return Response({'error': f'total_size must be between 1 and {max_upload_size()} bytes.'}, status=413)
+    sessions = UploadSession.objects.filter(user=request.user)
+    expire_sessions(sessions)
+    max_open = int(getattr(settings, 'CLIP_UPLOAD_MAX_OPEN_SESSIONS', 5))
+    if sessions.filter(status=UploadSession.STATUS_OPEN).count() >= max_open:
+        return Response({'error': f'Too many open upload sessions (max {max_open}); commit or abort one first.'}, status=429)
+    session = UploadSession.objects.create(
+        user=request.user,
+        filename=str(request.data.get('filename', ''))[:255],
+        total_size=total_size,
+    )
+    session_path(session).touch()
+    return Response(_session_data(session), status=201)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def uploadSession(request, session_id):
+    """GET: progress, to resume after a dropped connection. DELETE: abort and discard."""
+    try:
+        session = UploadSession.objects.get(id=session_id, user=request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload session not found.'}, status=404)
+    if request.method == 'DELETE' and session.status == UploadSession.STATUS_OPEN:
+        session.status = UploadSession.STATUS_ABORTED
+        session.save(update_fields=['status', 'updated_at'])
+        remove_quietly(session_path(session))
+    return Response(_session_data(session), status=200)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def uploadChunk(request, session_id, index):
+    """Append chunk `index` (raw request body). Requires an X-Chunk-Checksum header (sha256 hex).
+
+    Chunks must arrive in order; re-sending an already stored chunk is a no-op.
+    The body is spooled and verified first; the session row is only locked
+    for the local append.
+    """
+    checksum = request.headers.get('X-Chunk-Checksum', '').strip()
+    if not checksum:
+        return Response({'error': 'X-Chunk-Checksum header is required.'}, status=400)
+    try:
+        session = UploadSession.objects.get(id=session_id, user=request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload session not found.'}, status=404)
+    rejected = _chunk_rejection(session, index)
+    if rejected:
+        return rejected
+    # Read the body off the network before taking the row lock
+    try:
+        spooled = spool_chunk(request.stream, checksum, _chunk_limit(session))
+    except ChunkError as e:
+        return Response({'error': str(e), **_session_data(session)}, status=e.status)
+    try:
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(id=session.id)
+            rejected = _chunk_rejection(session, index)
+            if rejected:
+                return rejected
+            try:
+                with open(spooled, 'rb') as body:
+                    written = append_chunk(
+                        session_path(session), session.received_bytes, body, checksum, _chunk_limit(session),
+                    )
+            except ChunkError as e:
+                return Response({'error': str(e), **_session_data(session)}, status=e.status)
+            session.received_bytes += written
+            session.next_chunk += 1
+            start_prefix = (
+                not session.prefix_sampled
+                and session.received_bytes >= int(getattr(settings, 'CLIP_UPLOAD_PREFIX_BYTES', 4 * 1024 * 1024))
+            )
+            if start_prefix:
+                session.prefix_sampled = True
+            session.save(update_fields=['received_bytes', 'next_chunk', 'prefix_sampled', 'updated_at'])
+    finally:
+        remove_quietly(spooled)
+    if start_prefix:
+        # Start on the frames we already have while the rest is still uploading
+        get_executor().submit(warm_label_cache, str(session_path(session)))
+    return Response(_session_data(session), status=200)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def commitUploadSession(request, session_id):
+    """Finish a resumable upload and post the clip. Accepts JSON { "video_url": "...", "description": "..." }."""
+    video_url = request.data.get('video_url')
+    description = str(request.data.get('description', '')).strip()
+    if not video_url:
+        return Response({'error': 'video_url is required.'}, status=400)
+    with transaction.atomic():
         try:
-            os.remove(temp_full_path)
-        except Exception:
-            pass
-    else:
-        final_labels = []
-    clip = Clip.objects.create(caption=description, clipUrl=video_url, uploader=user)
-    # Tagging logic for categories
-    from .models import VideoCategory, TaggedVideo
-    for label, _ in final_labels:
-        category_obj, created = VideoCategory.objects.get_or_create(name=label)
-        TaggedVideo.objects.create(clip=clip, category=category_obj)
+            session = UploadSession.objects.select_for_update().get(id=session_id, user=request.user)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload session not found.'}, status=404)
+        if session.status != UploadSession.STATUS_OPEN:
+            return Response({'error': f'Upload session is {session.status}.', **_session_data(session)}, status=409)
+        if session.received_bytes == 0 or (session.total_size and session.received_bytes != session.total_size):
+            return Response({'error': 'Upload is incomplete.', **_session_data(session)}, status=409)
+
+        path = str(session_path(session))
+        clip = Clip.objects.create(caption=description, clipUrl=video_url, uploader=request.user)
+        job = ClassificationJob.objects.create(clip=clip)
+        session.status = UploadSession.STATUS_COMMITTED
+        session.clip = clip
+        session.save(update_fields=['status', 'clip', 'updated_at'])
+        # No digest here: hashing the whole file would hold the row lock for a
+        # full read. The worker hashes it if the label cache needs it.
+        enqueue_classification(job, path)
     return Response({
         'message': 'Clip posted successfully.',
-        'labels': final_labels,
-    })
+        'clip_id': clip.id,
+        'job_id': job.id,
+        'status': job.status,
+        'labels': [],
+    }, status=202)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def getClipJobStatus(request):
+    clip_id = request.GET.get('id')
+    if not clip_id:
+        return Response({'error': 'id is required'}, status=400)
+    try:
+        job = ClassificationJob.objects.get(clip_id=clip_id, clip__uploader=request.user)
+    except ClassificationJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=404)
+    return Response({
+        'clip_id': job.clip_id,
+        'job_id': job.id,
+        'status': job.status,
+        'labels': job.labels,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'updated_at': job.updated_at,
+    }, status=200)
 
 
 @api_view(['GET'])
@@ -237,6 +437,7 @@ def getMyClips(request):
             'likeCount': clip.likeCount,
             'created_at': clip.created_at,
             'categories': list(categories),
+            **clip.media_urls(request),
             'uploader': {
                 'id': clip.uploader.id if clip.uploader else None,
                 'username': clip.uploader.username if clip.uploader else None,
@@ -268,6 +469,7 @@ def fetchClips(request):
             'likeCount': clip.likeCount,
             'created_at': clip.created_at,
             'categories': list(categories),
+            **clip.media_urls(request),
             'uploader': {
                 'id': clip.uploader.id if clip.uploader else None,
                 'username': clip.uploader.username if clip.uploader else None,
@@ -293,7 +495,8 @@ def getClip(request):
             'clipUrl': clip.clipUrl,
             'likeCount': clip.likeCount,
             'created_at': clip.created_at,
-            'categories': list(categories)
+            'categories': list(categories),
+            **clip.media_urls(request),
         }
         return Response({'clip': clip_data}, status=200)
     except Clip.DoesNotExist:
@@ -315,6 +518,7 @@ def getLikedVideos(request):
             'likeCount': clip.likeCount,
             'created_at': clip.created_at,
             'categories': list(categories),
+            **clip.media_urls(request),
             'liked_at': like.created_at
         })
         # include uploader info